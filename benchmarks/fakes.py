@@ -0,0 +1,216 @@
+# benchmarks/fakes.py
+"""
+Local stand-ins for every external dependency of the pipeline:
+yfinance (in-process), RSS feeds, Groq chat completions and the Telegram Bot API
+(local HTTP servers). Everything is deterministic for a given seed.
+"""
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------------------------------------------- yfinance
+
+class FakeYFinance:
+    """Drop-in for the `yf` module used by scripts.fetch_engine."""
+
+    def __init__(self, history_days=500, batch_latency=0.05, info_latency=0.01, seed=7):
+        self.history_days = history_days
+        self.batch_latency = batch_latency
+        self.info_latency = info_latency
+        self.seed = seed
+        self.calls = {"download": 0, "info": 0}
+        self._dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=history_days, tz="Asia/Kolkata")
+        outer = self
+
+        class Ticker:
+            def __init__(self, symbol):
+                self.symbol = symbol
+
+            @property
+            def info(self):
+                return outer.info(self.symbol)
+
+        self.Ticker = Ticker
+
+    def _rng(self, symbol):
+        return np.random.default_rng(zlib.crc32(symbol.encode()) ^ self.seed)
+
+    def bars(self, symbol):
+        """Synthetic OHLCV random walk, stable per symbol."""
+        rng = self._rng(symbol)
+        n = len(self._dates)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.018, n)))
+        spread = np.abs(rng.normal(0, 0.01, n)) * close
+        return pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.004, n)),
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(10_000, 5_000_000, n).astype(float),
+        }, index=self._dates)
+
+    def download(self, tickers, start=None, period=None, **kwargs):
+        self.calls["download"] += 1
+        time.sleep(self.batch_latency)
+        frames = {}
+        for symbol in tickers:
+            df = self.bars(symbol)
+            if start is not None:
+                df = df[df.index >= pd.Timestamp(start, tz="Asia/Kolkata")]
+            frames[symbol] = df
+        return pd.concat(frames, axis=1)
+
+    def info(self, symbol):
+        self.calls["info"] += 1
+        time.sleep(self.info_latency)
+        rng = self._rng(symbol)
+        return {
+            "debtToEquity": float(rng.uniform(0, 150)),
+            "profitMargins": float(rng.uniform(-0.1, 0.25)),
+            "earningsTimestamp": None,
+        }
+
+
+# ---------------------------------------------------------------- HTTP servers
+
+class _Server:
+    """Threaded local HTTP server running in the background."""
+
+    def __init__(self, handler_cls):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body=b"", headers=None, content_type="application/json"):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+
+
+def rss_server(n_feeds, items_per_feed, symbols, latency=0.02, seed=7):
+    """
+    Serves /feed/<i> for i in range(n_feeds). Titles mix tickers, impact and
+    nuclear keywords. Supports ETag so a second poll returns 304.
+    """
+    rng = np.random.default_rng(seed)
+    words = ["ORDER", "CONTRACT", "TENDER", "SMR", "NPCIL", "policy", "update", "market", "results", "window"]
+    feeds = {}
+    for i in range(n_feeds):
+        items = []
+        for j in range(items_per_feed):
+            title_words = list(rng.choice(words, 4))
+            if symbols and rng.random() < 0.5:
+                title_words.insert(0, symbols[int(rng.integers(len(symbols)))])
+            items.append(
+                f"<item><title>{' '.join(title_words)} {i}-{j}</title>"
+                f"<link>http://bench.local/{i}/{j}</link>"
+                f"<pubDate>Mon, 01 Jan 2024 00:00:00 GMT</pubDate></item>"
+            )
+        body = ('<?xml version="1.0"?><rss version="2.0"><channel><title>Bench</title>'
+                + "".join(items) + "</channel></rss>").encode()
+        feeds[f"/feed/{i}"] = (body, f'"bench-{i}"')
+
+    class Handler(_QuietHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            entry = feeds.get(self.path)
+            if entry is None:
+                return self._send(404)
+            body, etag = entry
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304)
+            self._send(200, body, {"ETag": etag}, content_type="application/rss+xml")
+
+    server = _Server(Handler)
+    server.feed_urls = lambda: {f"Bench_{i}": f"{server.base_url}/feed/{i}" for i in range(n_feeds)}
+    return server
+
+
+def groq_server(latency=0.5, completion_tokens=400):
+    """OpenAI-compatible /openai/v1/chat/completions with configurable latency."""
+    stats = {"requests": 0, "prompt_chars": 0}
+
+    class Handler(_QuietHandler):
+        def do_POST(self):
+            request = json.loads(self._read_body() or b"{}")
+            prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+            stats["requests"] += 1
+            stats["prompt_chars"] += prompt_chars
+            time.sleep(latency)
+            body = json.dumps({
+                "id": f"bench-{stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "bench"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "BENCH DECISION\n" + "x" * completion_tokens * 4},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_chars // 4 + completion_tokens,
+                },
+            }).encode()
+            self._send(200, body)
+
+    server = _Server(Handler)
+    server.stats = stats
+    return server
+
+
+def telegram_server(rate_limit_every=10, retry_after=1):
+    """sendMessage endpoint that answers every Nth request with a 429."""
+    stats = {"requests": 0, "throttled": 0}
+    lock = threading.Lock()
+
+    class Handler(_QuietHandler):
+        def do_POST(self):
+            self._read_body()
+            with lock:
+                stats["requests"] += 1
+                throttle = rate_limit_every and stats["requests"] % rate_limit_every == 0
+                if throttle:
+                    stats["throttled"] += 1
+            if throttle:
+                body = json.dumps({"ok": False, "error_code": 429,
+                                   "parameters": {"retry_after": retry_after}}).encode()
+                return self._send(429, body)
+            self._send(200, b'{"ok":true,"result":{}}')
+
+    server = _Server(Handler)
+    server.stats = stats
+    return server
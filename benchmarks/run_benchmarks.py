@@ -0,0 +1,206 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline end-to-end benchmark of the strategic pipeline.
+
+    python -m benchmarks.run_benchmarks                       # default grid
+    python -m benchmarks.run_benchmarks --tickers 5,500 --feeds 10 --output bench_output.json
+
+Each (tickers, feeds) scenario runs in a fresh subprocess against the local
+stand-ins in benchmarks/fakes.py, with all data files redirected to a temp
+dir. Each scenario drives main.build_pipeline() through PipelineRunner twice:
+cold (full audit and send) and warm (unchanged data, so detection should
+keep the brain asleep). Output is one JSON record per scenario: per-stage
+wall time, peak RSS and throughput.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_TICKERS = [5, 500, 5000]
+DEFAULT_FEEDS = [10, 500]
+
+
+def _redirect_data(tmp):
+    """Points every on-disk store at a scratch dir so runs never touch data/."""
+    from scripts.bar_cache import BarCache
+    from scripts.brain import BrainService
+    from scripts.change_detector import ChangeDetector
+    from scripts.fundamentals_cache import FundamentalsCache
+    from scripts.metrics_store import MetricsStore
+    from scripts.news_api import NewsService
+    from scripts.news_store import NewsStore
+    from scripts.stock_api import StockService
+    from scripts.utils import Metrics
+
+    StockService.DATA_FILE = os.path.join(tmp, "price_list.json")
+    Metrics.DATA_FILE = os.path.join(tmp, "run_metrics.jsonl")
+    MetricsStore.DATA_DIR = tmp
+    MetricsStore.HISTORY_FILE = os.path.join(tmp, "metrics_history.bin")
+    MetricsStore.INDEX_FILE = os.path.join(tmp, "metrics_index.json")
+    MetricsStore.LEGACY_FILE = StockService.DATA_FILE
+    BarCache.CACHE_DIR = os.path.join(tmp, "bars")
+    FundamentalsCache.DATA_FILE = os.path.join(tmp, "fundamentals_cache.json")
+    NewsStore.DATA_DIR = tmp
+    NewsStore.LOG_FILE = os.path.join(tmp, "news_log.jsonl")
+    NewsStore.SEEN_FILE = os.path.join(tmp, "news_seen.idx")
+    NewsStore.TOP_K_FILE = os.path.join(tmp, "news_list.json")
+    NewsService.DATA_FILE = NewsStore.TOP_K_FILE
+    NewsService.FEED_STATE_FILE = os.path.join(tmp, "feed_state.json")
+    BrainService.PRICE_FILE = StockService.DATA_FILE
+    BrainService.NEWS_FILE = NewsStore.TOP_K_FILE
+    BrainService.CACHE_FILE = os.path.join(tmp, "brain_cache.json")
+    ChangeDetector.STATE_FILE = os.path.join(tmp, "change_state.json")
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _timed(stages, name, fn):
+    started = time.perf_counter()
+    result = fn()
+    stages[name] = {"wall_s": round(time.perf_counter() - started, 4), "peak_rss_mb": _peak_rss_mb()}
+    return result
+
+
+def _run_pipeline(stages, label, portfolios):
+    """One production pass: main.build_pipeline() through PipelineRunner, freshness skips off."""
+    import main
+
+    pipeline = main.build_pipeline(portfolios)
+    timings = {}
+    for stage in pipeline:
+        stage.fn = (lambda name, fn: lambda r: _timed(timings, name, lambda: fn(r)))(stage.name, stage.fn)
+    runner = main.PipelineRunner(pipeline, freshness_seconds=0)
+    _timed(stages, label, runner.run)
+    stages[label].update({"status": runner.status, "stages": timings})
+    return runner.results
+
+
+def run_scenario(n_tickers, n_feeds, args):
+    """Runs the production pipeline once cold (full audit) and once warm (nothing changed)."""
+    import logging
+    logging.disable(logging.CRITICAL)  # Benchmark the work, not the console
+
+    from benchmarks import fakes
+    from scripts import fetch_engine
+    from scripts.news_api import NewsService
+    from scripts.notifier import TelegramNotifier
+    from scripts.utils import Metrics
+
+    fake_yf = fakes.FakeYFinance(history_days=args.history_days, batch_latency=args.yf_latency)
+    fetch_engine.yf = fake_yf
+
+    symbols = [f"SYM{i:05d}.NS" for i in range(n_tickers)]
+    bases = [s.split(".")[0] for s in symbols]
+    NewsService._matcher = None
+    chat_ids = [str(1000 + i) for i in range(args.chats)]
+    # Watchlists dealt round-robin; every portfolio reports to the same chats
+    portfolios = [
+        {"name": f"bench_{i}", "budget": 20000, "tickers": symbols[i::args.portfolios], "chat_ids": chat_ids}
+        for i in range(args.portfolios)
+    ]
+
+    stages = {}
+    with tempfile.TemporaryDirectory() as tmp, \
+            fakes.rss_server(n_feeds, args.items_per_feed, bases) as rss, \
+            fakes.groq_server(latency=args.llm_latency) as groq, \
+            fakes.telegram_server(rate_limit_every=args.tg_429_every) as telegram:
+        _redirect_data(tmp)
+        NewsService.FEEDS = rss.feed_urls()
+        os.environ["GROQ_API_KEY"] = "bench"
+        os.environ["GROQ_BASE_URL"] = groq.base_url
+        os.environ["TELEGRAM_TOKEN"] = "bench"
+        TelegramNotifier.API_BASE = telegram.base_url
+
+        cold = _run_pipeline(stages, "pipeline_cold", portfolios)
+        llm_cold = groq.stats["requests"]
+        # Baseline is what the cold run reported; an unchanged warm tick must not wake the brain
+        warm = _run_pipeline(stages, "pipeline_warm", portfolios)
+
+        total_items = n_feeds * args.items_per_feed
+        cold_stages, warm_stages = stages["pipeline_cold"]["stages"], stages["pipeline_warm"]["stages"]
+        return {
+            "tickers": n_tickers,
+            "feeds": n_feeds,
+            "portfolios": args.portfolios,
+            "stages": stages,
+            "throughput": {
+                "price_cold_tickers_per_s": round(n_tickers / max(cold_stages["price"]["wall_s"], 1e-9), 1),
+                "price_warm_tickers_per_s": round(n_tickers / max(warm_stages["price"]["wall_s"], 1e-9), 1),
+                "news_items_per_s": round(total_items / max(cold_stages["news"]["wall_s"], 1e-9), 1),
+            },
+            "counters": {
+                "yf_download_calls": fake_yf.calls["download"],
+                "yf_info_calls": fake_yf.calls["info"],
+                "news_stored": len(cold.get("news") or []),
+                "material_events_warm": len(warm["detect"]["events"]) if warm.get("detect") else None,
+                "llm_requests_cold": llm_cold,
+                "llm_requests_warm": groq.stats["requests"] - llm_cold,
+                "llm_prompt_chars": groq.stats["prompt_chars"],
+                "telegram_requests": telegram.stats["requests"],
+                "telegram_429s": telegram.stats["throttled"],
+            },
+            "peak_rss_mb": _peak_rss_mb(),
+            "instrumentation": Metrics.snapshot(),
+        }
+
+
+def _scenario_subprocess(n_tickers, n_feeds, argv):
+    """Fresh interpreter per scenario so peak RSS and import caches don't leak."""
+    cmd = [sys.executable, "-m", "benchmarks.run_benchmarks", "--single", str(n_tickers), str(n_feeds)] + argv
+    root = os.path.join(os.path.dirname(__file__), "..")
+    proc = subprocess.run(cmd, cwd=root, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"tickers": n_tickers, "feeds": n_feeds, "error": proc.stderr.strip().splitlines()[-1:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline StockWatcher pipeline benchmark.")
+    parser.add_argument("--tickers", default=",".join(map(str, DEFAULT_TICKERS)))
+    parser.add_argument("--feeds", default=",".join(map(str, DEFAULT_FEEDS)))
+    parser.add_argument("--items-per-feed", type=int, default=20)
+    parser.add_argument("--history-days", type=int, default=500)
+    parser.add_argument("--yf-latency", type=float, default=0.05, help="Seconds per fake batch download")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per fake Groq completion")
+    parser.add_argument("--tg-429-every", type=int, default=10, help="Fake Telegram returns 429 every Nth call")
+    parser.add_argument("--chats", type=int, default=5)
+    parser.add_argument("--portfolios", type=int, default=1, help="Watchlists the tickers are split across")
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout")
+    parser.add_argument("--single", nargs=2, type=int, metavar=("TICKERS", "FEEDS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_scenario(args.single[0], args.single[1], args)))
+        return
+
+    passthrough = [
+        "--items-per-feed", str(args.items_per_feed), "--history-days", str(args.history_days),
+        "--yf-latency", str(args.yf_latency), "--llm-latency", str(args.llm_latency),
+        "--tg-429-every", str(args.tg_429_every), "--chats", str(args.chats),
+        "--portfolios", str(args.portfolios),
+    ]
+    report = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "scenarios": []}
+    for n_tickers in [int(x) for x in args.tickers.split(",")]:
+        for n_feeds in [int(x) for x in args.feeds.split(",")]:
+            result = _scenario_subprocess(n_tickers, n_feeds, passthrough)
+            report["scenarios"].append(result)
+            print(json.dumps(result), file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,218 @@
 # main.py
-import os
 import logging
-from groq import Groq
-from scripts.brain import BrainService
-from scripts.notifier import TelegramNotifier
-from scripts.stock_api import StockService # Added direct import for safety
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from scripts.change_detector import ChangeDetector
+from scripts.metrics_store import MetricsStore
+from scripts.news_api import NewsService
+from scripts.portfolios import PortfolioService
+from scripts.stock_api import StockService
+from scripts.utils import Metrics, get_logger
 
 # High-Density Logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("StrategicWatcher_Main")
+logger = get_logger("StrategicWatcher_Main")
+
+# Stage outputs younger than this are considered fresh and the stage is skipped
+FRESHNESS_SECONDS = float(os.getenv("PIPELINE_FRESHNESS_SECONDS", "600"))
+
+
+class Stage:
+    """
+    One node of the pipeline DAG.
+    fn(results) receives the results of finished stages by name.
+    hard_deps must succeed; soft_deps only need to finish (a failed fetch
+    still lets the brain run on the last data on disk).
+    updated_at() returns the epoch time recorded inside the stage's output
+    (not the file mtime, which a git checkout resets), or None if unknown.
+    timeout: the runner abandons the stage after this many seconds. Its thread
+    (and any pool it started) can't be killed and would be joined at exit, so
+    run_strategic_audit() ends the process with os._exit once metrics are
+    flushed if any stage timed out.
+    """
+    def __init__(self, name, fn, hard_deps=(), soft_deps=(), updated_at=None, timeout=300):
+        self.name = name
+        self.fn = fn
+        self.hard_deps = tuple(hard_deps)
+        self.soft_deps = tuple(soft_deps)
+        self.updated_at = updated_at
+        self.timeout = timeout
+
+    @property
+    def deps(self):
+        return self.hard_deps + self.soft_deps
+
+    def is_fresh(self, freshness_seconds):
+        if self.updated_at is None or freshness_seconds <= 0:
+            return False
+        try:
+            updated_at = self.updated_at()
+        except Exception as e:
+            logger.warning(f"⚠️ Freshness check for '{self.name}' failed, running it: {e}")
+            return False
+        return updated_at is not None and time.time() - updated_at < freshness_seconds
+
+
+class PipelineRunner:
+    """
+    Runs stages as soon as their dependencies finish, independent stages in
+    parallel. Each stage gets a timeout and its own failure handling, so the
+    critical path is max(fetch) + brain instead of the sum of every stage.
+    """
+    OK, SKIPPED, FAILED, TIMEOUT = "ok", "skipped", "failed", "timeout"
+
+    def __init__(self, stages, freshness_seconds=FRESHNESS_SECONDS, max_workers=4):
+        self.stages = {s.name: s for s in stages}
+        self.freshness_seconds = freshness_seconds
+        self.max_workers = max_workers
+        self.status = {}
+        self.results = {}
+
+    def _ready(self, stage):
+        return all(d in self.status for d in stage.deps)
+
+    def _blocked(self, stage):
+        return any(self.status[d] not in (self.OK, self.SKIPPED) for d in stage.hard_deps)
+
+    def _timed(self, stage):
+        started = time.monotonic()
+        with Metrics.span(f"stage.{stage.name}"):
+            result = stage.fn(self.results)
+        logger.info(f"⏱️ Stage '{stage.name}' finished in {time.monotonic() - started:.2f}s.")
+        return result
+
+    def run(self):
+        pending = dict(self.stages)
+        running = {}  # future -> (stage, deadline)
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                for name in list(pending):
+                    stage = pending[name]
+                    if not self._ready(stage):
+                        continue
+                    del pending[name]
+                    if self._blocked(stage):
+                        logger.warning(f"⏭️ Stage '{name}' skipped: a required upstream stage did not succeed.")
+                        self.status[name] = self.SKIPPED
+                        self.results[name] = None
+                    elif stage.is_fresh(self.freshness_seconds):
+                        logger.info(f"♻️ Stage '{name}' skipped: outputs are fresher than {self.freshness_seconds:.0f}s.")
+                        self.status[name] = self.SKIPPED
+                        self.results[name] = None
+                    else:
+                        logger.info(f"▶️ Stage '{name}' started.")
+                        future = pool.submit(self._timed, stage)
+                        running[future] = (stage, time.monotonic() + stage.timeout)
+
+                if not running:
+                    if pending and not any(self._ready(s) for s in pending.values()):
+                        raise RuntimeError(f"Pipeline has unsatisfiable dependencies: {sorted(pending)}")
+                    continue
+
+                next_deadline = min(deadline for _, deadline in running.values())
+                done, _ = wait(list(running), timeout=max(0.0, next_deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    stage, _ = running.pop(future)
+                    try:
+                        self.results[stage.name] = future.result()
+                        self.status[stage.name] = self.OK
+                    except Exception as e:
+                        logger.error(f"💥 Stage '{stage.name}' failed: {e}", exc_info=True)
+                        self.results[stage.name] = None
+                        self.status[stage.name] = self.FAILED
+
+                now = time.monotonic()
+                for future, (stage, deadline) in list(running.items()):
+                    if now >= deadline:
+                        # Threads can't be killed; abandon it and let downstream move on
+                        logger.error(f"⏱️ Stage '{stage.name}' timed out after {stage.timeout}s.")
+                        running.pop(future)
+                        self.results[stage.name] = None
+                        self.status[stage.name] = self.TIMEOUT
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        logger.info(f"📋 Pipeline status: {self.status}")
+        return self.status
+
+
+def _detect(portfolios):
+    """Reads the on-disk snapshots the brain would use and diffs them against the last report."""
+    from scripts.brain import BrainService
+    return ChangeDetector.plan(BrainService._read_prices(), BrainService._read_json(BrainService.NEWS_FILE),
+                               portfolios)
+
+
+def _audit(portfolios, results):
+    plan = results.get("detect")
+    if plan is not None and not plan["events"] and not plan["digest"]:
+        logger.info("😴 No material change and no digest due, brain stays asleep.")
+        return {}
+    return PortfolioService.run_audits(portfolios, plan=plan)
+
+
+def _notify(portfolios, results):
+    decisions = results.get("brain")
+    plan = results.get("detect")
+    if decisions == {} and plan is not None:
+        logger.info("📭 Nothing material to report this tick.")
+        return True
+    if not decisions or not any(decisions.values()):
+        logger.error("🚫 No decision produced, skipping notification.")
+        return False
+    for name, response_text in decisions.items():
+        if response_text:
+            print("\n" + "="*40 + f"\n[{name}]\n" + response_text + "\n" + "="*40)
+    sent = PortfolioService.deliver(portfolios, decisions)
+    # Only delivered portfolios move their baseline; the others retry next tick without re-alerting these
+    ChangeDetector.commit(plan, [name for name, ok in sent.items() if ok])
+    return all(sent.values())
+
+
+def build_pipeline(portfolios=None):
+    """Market data is fetched once for the union of every portfolio's tickers."""
+    portfolios = portfolios or PortfolioService.load()
+    universe = PortfolioService.union_tickers(portfolios)
+    return [
+        Stage("price", lambda r: StockService.update_prices(universe),
+              updated_at=MetricsStore.last_updated, timeout=600),
+        Stage("news", lambda r: NewsService.fetch_and_filter(universe),
+              updated_at=NewsService.last_polled, timeout=120),
+        # Milliseconds: decides whether this tick needs the model at all
+        Stage("detect", lambda r: _detect(portfolios), soft_deps=["price", "news"], timeout=60),
+        # Brain reads the on-disk snapshots, so a failed fetch falls back to the last good data;
+        # a failed detect means a full audit. Extra time per portfolio: the Groq rate limiter may queue calls
+        Stage("brain", lambda r: _audit(portfolios, r),
+              soft_deps=["price", "news", "detect"], timeout=180 + 30 * (len(portfolios) - 1)),
+        Stage("notify", lambda r: _notify(portfolios, r), hard_deps=["brain"], timeout=120),
+    ]
+
 
 def run_strategic_audit():
     logger.info("🎬 [SYSTEM START] 3-Layer Strategic Audit...")
-    
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        logger.critical("🚫 MISSING API KEY.")
-        return
 
+    status = {}
     try:
-        client = Groq(api_key=api_key)
-        
-        # 1. GENERATE PAYLOAD
-        payload_content = BrainService.prepare_payload()
-        
-        # 2. CALL LLaMA 3.3 70B
-        logger.info("📡 Analyzing with LLaMA 3.3 70B...")
-        completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": payload_content}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.1, # Lowest temp for math/logic adherence
-            max_tokens=1024
-        )
-        
-        response_text = completion.choices[0].message.content
-        
-        # 3. NOTIFY
-        if response_text:
-            print("\n" + "="*40 + "\n" + response_text + "\n" + "="*40)
-            TelegramNotifier.send_alpha(response_text)
+        status = PipelineRunner(build_pipeline()).run()
+        if status.get("notify") == PipelineRunner.OK:
             logger.info("✅ Cycle Complete.")
-            
+
     except Exception as e:
         logger.error(f"💥 Failure: {e}", exc_info=True)
+    finally:
+        Metrics.flush("audit")
+
+    if PipelineRunner.TIMEOUT in status.values():
+        # A hung stage thread (e.g. a stuck yf.download) would block interpreter exit.
+        # Exit 0 like any other stage failure, so the workflow still persists data.
+        logger.warning("⏱️ Abandoned stages still running, exiting without joining them.")
+        logging.shutdown()
+        sys.stdout.flush()
+        os._exit(0)
 
 if __name__ == "__main__":
-    run_strategic_audit()
\ No newline at end of file
+    run_strategic_audit()
@@ -0,0 +1,267 @@
+# scripts/backtest.py
+"""
+Historical replay of the SIP scoring model.
+
+    python -m scripts.backtest                          # default grid on cached bars
+    python -m scripts.backtest --period 5y --workers 8 --output data/backtest.json
+
+Trend and fundamentals rules are replayed on the first trading day of every
+month, vectorized over (tickers x months). Each run is compared with a plain
+equal-weight SIP of the same monthly budget.
+
+Known limits: fundamentals are today's cached margins for every month
+(look-ahead), and there is no news history, so NEWS is a constant param.
+"""
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scripts.indicators import IndicatorEngine
+from scripts.scoring import ScoringEngine
+from scripts.structure import StructureEngine
+from scripts.utils import get_logger
+
+logger = get_logger("SIP_Backtest")
+
+
+class BacktestEngine:
+    """
+    Monthly SIP simulator over aligned (tickers x days) matrices.
+    Indicator series are computed once per (EMA span, window) and shared by
+    every parameter set that uses them; sweeps fan out over a process pool.
+    """
+    BUDGET = 20000
+    MIN_BARS = IndicatorEngine.MIN_BARS
+
+    DEFAULT_PARAMS = {
+        "weights": (ScoringEngine.WEIGHTS["trend"], ScoringEngine.WEIGHTS["news"], ScoringEngine.WEIGHTS["fundamentals"]),
+        "thresholds": tuple(b[0] for b in ScoringEngine.BANDS[:-1]),
+        "units": tuple(b[2] for b in ScoringEngine.BANDS),
+        "ema_span": 50,
+        "window": IndicatorEngine.STRUCTURE_WINDOW,
+        "news_score": 0.0,
+    }
+
+    DEFAULT_GRID = {
+        "weights": [(0.3, 0.2, 0.5), (0.4, 0.1, 0.5), (0.5, 0.0, 0.5)],
+        "thresholds": [(0.7, 0.5, 0.3), (0.6, 0.45, 0.3)],
+        "ema_span": [20, 50, 100],
+        "window": [21, 63, 126],
+    }
+
+    def __init__(self, dates, close, high, low, margins, budget=None):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.close = close
+        self.high = high
+        self.low = low
+        self.margins = np.asarray(margins, dtype=float)
+        self.budget = budget or self.BUDGET
+        self.decision_idx = self.month_starts(self.dates)
+        # Rebalance prices; NaN means not tradable that day
+        self.prices = close[:, self.decision_idx]
+        bars_seen = np.cumsum(~np.isnan(close), axis=1)[:, self.decision_idx]
+        self.tradable = (bars_seen >= self.MIN_BARS) & ~np.isnan(self.prices)
+        self.last_price = IndicatorEngine.last_valid(close)
+        self._ema = {}
+        self._codes = {}
+        self._baseline = None
+
+    @staticmethod
+    def month_starts(dates):
+        """Column index of the first trading day of each calendar month."""
+        months = dates.astype("datetime64[M]")
+        if not len(months):
+            return np.array([], dtype=int)
+        return np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+
+    def _bull(self, span):
+        if span not in self._ema:
+            ema = IndicatorEngine.ema(self.close, span)[:, self.decision_idx]
+            self._ema[span] = self.prices > ema
+        return self._ema[span]
+
+    def _structure(self, window):
+        if window not in self._codes:
+            self._codes[window] = StructureEngine.codes(self.high, self.low, window)[:, self.decision_idx]
+        return self._codes[window]
+
+    def allocations(self, params):
+        """(tickers x months) rupee allocations for one parameter set."""
+        p = {**self.DEFAULT_PARAMS, **params}
+        w_trend, w_news, w_fund = p["weights"]
+        bull = self._bull(p["ema_span"])
+        code = self._structure(p["window"])
+
+        # Same rules as ScoringEngine.trend_scores, on structure codes
+        trend = np.select([bull & (code == 1), code >= 0], [1.0, 0.5], default=0.0)
+        fundamentals = ScoringEngine.fundamental_scores(self.margins)[:, None]
+        score = np.round(w_trend * trend + w_news * p["news_score"] + w_fund * fundamentals, 4)
+
+        thresholds = np.asarray(p["thresholds"])
+        band = np.sum(score[:, :, None] < thresholds[None, None, :], axis=2)  # 0 = top band
+        units = np.asarray(p["units"], dtype=float)[band] * self.tradable
+
+        total_units = units.sum(axis=0, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total_units > 0, units / total_units * self.budget, 0.0)
+
+    def equal_weight(self):
+        counts = self.tradable.sum(axis=0, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, self.tradable / counts * self.budget, 0.0)
+
+    @staticmethod
+    def _xirr(times, flows):
+        """Annualized money-weighted return by bisection; times in years."""
+        def npv(rate):
+            return np.sum(flows / (1.0 + rate) ** times)
+        lo, hi = -0.99, 10.0
+        if npv(lo) * npv(hi) > 0:
+            return None
+        for _ in range(100):
+            mid = (lo + hi) / 2
+            if npv(lo) * npv(mid) <= 0:
+                hi = mid
+            else:
+                lo = mid
+        return (lo + hi) / 2
+
+    def evaluate(self, allocation):
+        """Undeployed budget is held as cash at 0%. Returns summary stats."""
+        months = allocation.shape[1]
+        invested = self.budget * months
+        shares = np.where(self.tradable, allocation / np.where(self.tradable, self.prices, 1.0), 0.0)
+        holdings = np.cumsum(shares, axis=1)
+        cash = np.cumsum(self.budget - allocation.sum(axis=0))
+
+        # Mark-to-market at each rebalance (before that month's buy) and at the end
+        marks = np.nan_to_num(self.prices)
+        curve = np.r_[0.0, (holdings[:, :-1] * marks[:, 1:]).sum(axis=0) + cash[:-1]] if months else np.array([])
+        final_value = float(np.nansum(holdings[:, -1] * self.last_price) + cash[-1]) if months else 0.0
+
+        contributed = self.budget * np.arange(months)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(contributed > 0, curve / contributed, 1.0)
+        drawdown = float(np.max(1.0 - ratio / np.maximum.accumulate(ratio))) if months else 0.0
+
+        start = self.dates[self.decision_idx[0]] if months else None
+        times = np.r_[(self.dates[self.decision_idx] - start).astype(float),
+                      (self.dates[-1] - start).astype(float)] / 365.25 if months else np.array([])
+        flows = np.r_[-np.full(months, float(self.budget)), final_value]
+        xirr = self._xirr(times, flows) if months else None
+
+        return {
+            "months": int(months),
+            "invested": float(invested),
+            "deployed_pct": round(float(allocation.sum() / invested * 100), 2) if invested else 0.0,
+            "final_value": round(final_value, 2),
+            "return_pct": round((final_value / invested - 1) * 100, 2) if invested else 0.0,
+            "xirr_pct": round(xirr * 100, 2) if xirr is not None else None,
+            "max_drawdown_pct": round(drawdown * 100, 2),
+        }
+
+    def run(self, params):
+        strategy = self.evaluate(self.allocations(params))
+        if self._baseline is None:
+            self._baseline = self.evaluate(self.equal_weight())
+        baseline = self._baseline
+        return {
+            "params": {**self.DEFAULT_PARAMS, **params},
+            "sip": strategy,
+            "equal_weight": baseline,
+            "excess_return_pct": round(strategy["return_pct"] - baseline["return_pct"], 2),
+        }
+
+    @staticmethod
+    def expand_grid(grid):
+        keys = list(grid)
+        return [dict(zip(keys, combo)) for combo in itertools.product(*(grid[k] for k in keys))]
+
+
+# Per-process engine for sweeps: the matrices are shipped once per worker, not per task
+_worker_engine = None
+
+
+def _init_worker(dates, close, high, low, margins, budget):
+    global _worker_engine
+    _worker_engine = BacktestEngine(dates, close, high, low, margins, budget)
+
+
+def _run_params(params):
+    return _worker_engine.run(params)
+
+
+def sweep(engine_args, grid, workers=None):
+    """Runs every combination in grid across a process pool. Returns results best-first."""
+    combos = BacktestEngine.expand_grid(grid)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"🧪 Sweeping {len(combos)} parameter sets on {workers} workers...")
+    # Group by indicator params so each worker reuses its cached EMA/structure series
+    combos.sort(key=lambda p: (p.get("ema_span", 0), p.get("window", 0)))
+    chunk = max(1, len(combos) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=engine_args) as pool:
+        results = list(pool.map(_run_params, combos, chunksize=chunk))
+    results.sort(key=lambda r: r["excess_return_pct"], reverse=True)
+    return results
+
+
+def load_universe(symbols, period=None):
+    """Daily bars from the BarCache (or a fresh pull for `period`) plus cached margins."""
+    from scripts.bar_cache import BarCache
+    from scripts.fetch_engine import FetchEngine
+    from scripts.fundamentals_cache import FundamentalsCache
+
+    if period:
+        frames = FetchEngine.fetch_history(symbols, period=period)
+    else:
+        frames = {s: df for s in symbols if (df := BarCache.load(s)) is not None}
+    symbols_, dates, close, high, low = IndicatorEngine.stack(frames)
+    cache = FundamentalsCache._load_storage()
+    margins = [float((cache.get(s) or {}).get("profitMargins") or 0.0) for s in symbols_]
+    return symbols_, dates, close, high, low, margins
+
+
+def main():
+    from scripts.stock_api import StockService
+
+    parser = argparse.ArgumentParser(description="Backtest the SIP scoring model.")
+    parser.add_argument("--tickers", help="Comma-separated symbols (default: StockService.TICKERS)")
+    parser.add_argument("--period", help="Fetch this much history (e.g. 5y) instead of using the bar cache")
+    parser.add_argument("--budget", type=float, default=BacktestEngine.BUDGET)
+    parser.add_argument("--grid", help="JSON file {param: [values]} (default: BacktestEngine.DEFAULT_GRID)")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="Write all results as JSON here")
+    args = parser.parse_args()
+
+    symbols = args.tickers.split(",") if args.tickers else StockService.TICKERS
+    symbols_, dates, close, high, low, margins = load_universe(symbols, args.period)
+    if not symbols_:
+        logger.error("❌ No history available; run the price stage first or pass --period.")
+        return
+    logger.info(f"📚 {len(symbols_)} tickers x {len(dates)} days loaded.")
+
+    grid = BacktestEngine.DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = {k: [tuple(v) if isinstance(v, list) else v for v in values] for k, values in json.load(f).items()}
+
+    engine_args = (np.asarray(dates, dtype="datetime64[D]"), close, high, low, np.asarray(margins), args.budget)
+    results = sweep(engine_args, grid, args.workers)
+
+    for r in results[:args.top]:
+        p, s, b = r["params"], r["sip"], r["equal_weight"]
+        print(f"w={p['weights']} bands={p['thresholds']} ema={p['ema_span']} win={p['window']} | "
+              f"SIP {s['return_pct']:+.1f}% (xirr {s['xirr_pct']}%, dd {s['max_drawdown_pct']}%, "
+              f"deployed {s['deployed_pct']}%) vs EW {b['return_pct']:+.1f}% -> {r['excess_return_pct']:+.1f}pp")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
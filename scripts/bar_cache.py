@@ -0,0 +1,171 @@
+# scripts/bar_cache.py
+import os
+import numpy as np
+import pandas as pd
+from scripts.fetch_engine import FetchEngine
+from scripts.utils import Metrics, get_logger
+
+logger = get_logger("SIP_Bar_Cache")
+
+
+class BarCache:
+    """
+    Incremental on-disk OHLCV store (one NPZ file per ticker under data/bars/).
+    Each run only downloads bars newer than the last cached date, so the
+    EMA/structure math runs on local history instead of a fresh 1Y pull.
+    Bars are split/dividend adjusted, so every incremental fetch overlaps the
+    cache by one completed bar; if Yahoo re-based the series since, the
+    ticker's history is pulled again instead of splicing two price bases.
+    """
+    CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "bars")
+    COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+    # Cold-start depth. Widening this only costs one download per new ticker.
+    HISTORY_PERIOD = "2y"
+    # Relative close difference on the overlap bar that means the history was re-adjusted
+    ADJUSTMENT_TOLERANCE = 1e-3
+
+    # Resident copy for long-running processes: {symbol: (file mtime, DataFrame)}
+    _memory = {}
+
+    @classmethod
+    def _path(cls, symbol):
+        return os.path.join(cls.CACHE_DIR, f"{symbol}.npz")
+
+    @classmethod
+    def load(cls, symbol):
+        """Returns the cached daily bars as a DataFrame, or None if not cached."""
+        path = cls._path(symbol)
+        if not os.path.exists(path):
+            return None
+        mtime = os.stat(path).st_mtime_ns
+        remembered = cls._memory.get(symbol)
+        if remembered is not None and remembered[0] == mtime:
+            return remembered[1]
+        try:
+            with np.load(path) as store:
+                index = pd.DatetimeIndex(store["dates"].astype("datetime64[D]"), name="Date")
+                df = pd.DataFrame({c: store[c] for c in cls.COLUMNS}, index=index)
+            cls._memory[symbol] = (mtime, df)
+            return df
+        except Exception as e:
+            logger.error(f"❌ Corrupt bar cache for {symbol}, ignoring: {e}")
+            return None
+
+    @classmethod
+    def _save(cls, symbol, df):
+        os.makedirs(cls.CACHE_DIR, exist_ok=True)
+        path = cls._path(symbol)
+        tmp_path = path + ".tmp.npz"
+        arrays = {c: df[c].to_numpy(dtype="float64") for c in cls.COLUMNS}
+        arrays["dates"] = df.index.values.astype("datetime64[D]").astype("int64")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)  # Atomic swap so a crashed run never leaves half a file
+        cls._memory[symbol] = (os.stat(path).st_mtime_ns, df)
+
+    @classmethod
+    def _normalize(cls, df):
+        """Strips timezone/intraday time so bars are keyed by trading date."""
+        df = df.copy()
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        df.index = index.normalize()
+        df = df[~df.index.duplicated(keep="last")]
+        return df.reindex(columns=cls.COLUMNS).astype("float64")
+
+    @classmethod
+    def drop(cls, symbol):
+        cls._memory.pop(symbol, None)
+        try:
+            os.remove(cls._path(symbol))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def _overlap_start(cls, cached):
+        """Incremental fetches start at the last *completed* cached bar (the last one may be intraday)."""
+        return cached.index[-2] if len(cached) >= 2 else cached.index[-1]
+
+    @classmethod
+    def _rebased(cls, cached, new_bars):
+        """True if the overlap bar's close moved, i.e. a split, bonus or dividend re-adjusted the series."""
+        if len(cached) < 2 or new_bars is None or new_bars.empty:
+            return False
+        new_bars = cls._normalize(new_bars)
+        day = cached.index[-2]
+        if day not in new_bars.index:
+            return False
+        old, new = cached.at[day, "Close"], new_bars.at[day, "Close"]
+        if not (np.isfinite(old) and np.isfinite(new)) or old == 0:
+            return False
+        return abs(new / old - 1.0) > cls.ADJUSTMENT_TOLERANCE
+
+    @classmethod
+    def append(cls, symbol, new_bars):
+        """
+        Merges freshly downloaded bars into the cache. Bars on or after the first
+        new date replace cached ones (the last cached bar may have been intraday).
+        """
+        new_bars = cls._normalize(new_bars)
+        cached = cls.load(symbol)
+        if cached is not None and not new_bars.empty:
+            cached = cached[cached.index < new_bars.index[0]]
+            merged = pd.concat([cached, new_bars])
+        elif cached is not None:
+            merged = cached
+        else:
+            merged = new_bars
+        merged = merged.sort_index()
+        cls._save(symbol, merged)
+        return merged
+
+    @classmethod
+    def refresh(cls, symbols):
+        """
+        Brings the cache up to date for every symbol and returns {symbol: DataFrame}.
+        Cold tickers get HISTORY_PERIOD; warm tickers are grouped by their last
+        completed cached date and fetched from that date onward in batched
+        requests. Re-based warm tickers join the cold batch.
+        """
+        cold = []
+        warm_groups = {}
+        cached_frames = {}
+        for symbol in symbols:
+            cached = cls.load(symbol)
+            if cached is None or cached.empty:
+                cold.append(symbol)
+            else:
+                cached_frames[symbol] = cached
+                start = cls._overlap_start(cached).strftime("%Y-%m-%d")
+                warm_groups.setdefault(start, []).append(symbol)
+
+        logger.info(f"💾 Bar cache: {len(cached_frames)} warm, {len(cold)} cold tickers.")
+
+        results = {}
+        rebased = []
+        for start, group in warm_groups.items():
+            logger.info(f"📡 Incremental fetch for {len(group)} tickers since {start}...")
+            fetched = FetchEngine.fetch_history(group, start=start)
+            for symbol in group:
+                if symbol not in fetched:
+                    # Network miss: fall back to what we already have on disk
+                    results[symbol] = cached_frames[symbol]
+                elif cls._rebased(cached_frames[symbol], fetched[symbol]):
+                    rebased.append(symbol)
+                else:
+                    results[symbol] = cls.append(symbol, fetched[symbol])
+
+        if rebased:
+            logger.warning(f"🔁 Corporate action re-based {len(rebased)} tickers, refetching full history: {rebased}")
+            Metrics.incr("bars.rebased", len(rebased))
+        if cold or rebased:
+            fetched = FetchEngine.fetch_history(cold + rebased, period=cls.HISTORY_PERIOD)
+            for symbol, df in fetched.items():
+                if symbol in cached_frames:
+                    cls.drop(symbol)  # Nothing from the old price basis may survive the merge
+                results[symbol] = cls.append(symbol, df)
+            for symbol in rebased:
+                if symbol not in results:
+                    # Refetch failed: keep the old file so the next run retries the check
+                    results[symbol] = cached_frames[symbol]
+        return results
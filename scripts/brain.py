@@ -1,21 +1,41 @@
+import hashlib
 import json
 import os
-import logging
-from groq import Groq
+import threading
+from datetime import datetime
+from scripts.metrics_store import MetricsStore
+from scripts.payload import PayloadBuilder
+from scripts.scoring import ScoringEngine
+from scripts.utils import Metrics, TokenBucket, get_logger
 
 
 # Custom Instruction: Always add lots of logs
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("PortfolioManager_Brain")
+logger = get_logger("PortfolioManager_Brain")
 
 class BrainService:
     # Hard constraint: Monthly SIP Budget
     TOTAL_BUDGET = 20000 
     PRICE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "price_list.json")
     NEWS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "news_list.json")
+    CACHE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "brain_cache.json")
+    CACHE_MAX_ENTRIES = 50
+
+    MODEL = "llama-3.3-70b-versatile"
+    MAX_TOKENS = 1024
+    # Bump whenever the system prompt or scoring rules change to invalidate cached decisions
+    PROMPT_VERSION = "sip-alpha-v7"
+    # "narrate": LLM explains the computed table | "numbers": no model call at all
+    MODE = os.getenv("BRAIN_MODE", "narrate")
+
+    # Groq quota, shared by every concurrent audit in the process
+    REQUESTS_PER_MINUTE = float(os.getenv("GROQ_RPM", "30"))
+    TOKENS_PER_MINUTE = float(os.getenv("GROQ_TPM", "12000"))
+    _request_bucket = TokenBucket(REQUESTS_PER_MINUTE / 60.0, max(1.0, REQUESTS_PER_MINUTE / 6))
+    _token_bucket = TokenBucket(TOKENS_PER_MINUTE / 60.0, TOKENS_PER_MINUTE)
+    _cache_lock = threading.Lock()
     
     @classmethod
-    def _read_json(cls, file_path):
+    def _read_json(cls, file_path, latest_snapshot=False):
         """Helper method to safely read JSON data."""
         logger.info(f"📂 Reading data from: {file_path}")
         if not os.path.exists(file_path):
@@ -25,7 +45,7 @@ class BrainService:
             with open(file_path, 'r') as f:
                 data = json.load(f)
                 # If it's the price_list (a list of snapshots), take the last one
-                if isinstance(data, list) and len(data) > 0:
+                if latest_snapshot and isinstance(data, list) and len(data) > 0:
                     return data[-1]
                 return data
         except Exception as e:
@@ -33,85 +53,198 @@ class BrainService:
             return {}
 
     @classmethod
-    def prepare_payload(cls):
+    def _read_prices(cls):
+        """Latest snapshot from the metrics history; falls back to the JSON view."""
+        try:
+            latest = MetricsStore.latest()
+        except Exception as e:
+            logger.error(f"❌ Metrics history unreadable, using {cls.PRICE_FILE}: {e}")
+            latest = {}
+        if latest:
+            logger.info(f"🗄️ Latest metrics snapshot {latest['date']} read from history store.")
+            return latest
+        return cls._read_json(cls.PRICE_FILE, latest_snapshot=True)
+
+    @classmethod
+    def score(cls, prices, news, budget=None):
+        """Deterministic 30/20/50 scores, bands and ₹ allocation for the snapshot."""
+        metrics = prices.get("metrics", {}) if isinstance(prices, dict) else {}
+        return ScoringEngine.score_universe(metrics, news if isinstance(news, list) else [], budget or cls.TOTAL_BUDGET)
+
+    @classmethod
+    def prepare_payload(cls, prices, news, scores, budget=None, events=None, focus=None):
+        """Builds the chat messages for a single Decision Layer inference."""
         logger.info("🧠 Initializing SIP Alpha Deployment Engine...")
-        
-        prices = cls._read_json(cls.PRICE_FILE)
-        news = cls._read_json(cls.NEWS_FILE)
-        
-        
-        # Validate Environment
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            logger.error("❌ GROQ_API_KEY missing from environment.")
-            return "ERROR: Missing API Key"
-
-        client = Groq(api_key=api_key)
-        
-        # The System Prompt is the 'Decision Layer'
-        system_prompt = """
-        You are the 'SIP Alpha Allocation Engine'. You manage a ₹{cls.TOTAL_BUDGET} monthly deployment.
-        Your role is to convert raw market data into capital deployment actions.
-        
-        
-        ### 1. SCORING MODEL (Strict Weighting: 30/20/50)
-        
-        - TREND (30% weight):
-            +1.0: 'is_structural_bull' is True AND 'market_structure' is 'BULLISH (HH/HL)'.
-            +0.5: 'market_structure' is 'RANGE_BOUND / FLATTENING' (regardless of price vs EMA50).
-            +0.0: 'market_structure' is 'BEARISH (LH/LL)' (The Falling Knife).
-
-        - NEWS (20% weight):
-            +1.0: Policy tailwind + EXECUTION evidence (Orders, Tenders, JV).
-            +0.5: Policy/Sector tailwind ONLY (Headlines).
-            +0.0: No relevant catalysts or negative execution.
-
-        - FUNDAMENTALS (50% weight):
-            +1.0: Margins > 8% (Stable or Improving).
-            +0.7: Margins 5–8% OR clear QoQ improvement.
-            +0.4: Turnaround narrative (Low margins but improving visibility).
-            +0.0: Structurally weak / Negative margins.
-
-        ### 2. ACTION BANDS (Capital Allocation)
-        - Score >= 0.7: 🟢 SIP AGGRESSIVE (Increase allocation)
-        - 0.5 - 0.69: 🟡 SIP NORMAL (Continue monthly)
-        - 0.3 - 0.49: 🟠 SIP PAUSE / WATCH (Maintain current, no new capital)
-        - < 0.3: 🔴 NO SIP (Discipline over emotion)
-        MATH: Individual Allocation = (Ticker Units / Total Units across all tickers) * ₹{cls.TOTAL_BUDGET}.
-        If all tickers are PAUSE/NO SIP, Allocation is ₹0 (Save cash).
-
-        ### 3. OUTPUT STRUCTURE (Telegram HTML)
-        - <b>🚀 SIP ALLOCATION SUMMARY</b>: Total deployment amount for the month.
-        - <b>Ticker Audit Table</b>: Wrapped in <pre> tags. Include Score, Action, and specific ₹ Allocation.
+        budget = budget or cls.TOTAL_BUDGET
+
+        # The System Prompt is the 'Decision Layer'. Scoring math is done in Python;
+        # the model explains the table, it never recomputes it.
+        system_prompt = f"""
+        You are the 'SIP Alpha Allocation Engine'. You manage a ₹{budget} monthly deployment.
+        Your role is to explain pre-computed capital deployment actions.
+
+        ### 1. SCORING MODEL (Already applied - Strict Weighting: 30/20/50)
+        - TREND (30%): 1.0 Structural bull + HH/HL | 0.5 Range-bound | 0.0 LH/LL (The Falling Knife).
+        - NEWS (20%): 1.0 Execution evidence (Orders, Tenders, JV) | 0.5 Ticker headline or critical sector news | <= 0.25 Routine sector news | 0.0 None.
+        - FUNDAMENTALS (50%): 1.0 Margins > 8% | 0.7 Margins 5–8% | 0.4 Thin margins | 0.0 Negative.
+        - Bands: >= 0.7 🟢 AGGRESSIVE | 0.5-0.69 🟡 NORMAL | 0.3-0.49 🟠 PAUSE / WATCH | < 0.3 🔴 NO SIP.
+
+        The TABLE you receive is final. Do NOT recompute scores, bands or ₹ allocations.
+        T/N/F are the trend, news and fundamentals scores; tickers getting ₹0 are grouped per action on one line.
+
+        ### 2. OUTPUT STRUCTURE (Telegram HTML)
+        - <b>🚀 SIP ALLOCATION SUMMARY</b>: Total deployment amount for the month (from the table).
+        - <b>Ticker Audit Table</b>: symbol, score, ₹ allocation and action for every allocated ticker inside <pre> tags,
+          then the ₹0 lines and the TOTAL line as given.
+        - Input tables are pipe-separated; structure codes are HH/HL, LH/LL and RANGE.
+        - 'structure' is the 3-month read and 'since' the date it last flipped (recent = fresh breakout/breakdown);
+          'tf' gives the 1-week and 1-month structure as early-warning context only.
         - <b>Re-entry Triggers</b>: What specifically moves a 'PAUSE' to 'NORMAL'.
         - Reasoning: (Explain using the 3 Layers: Trend, EMA50, and Policy)
-        - SIP Advice:** (Allocate ₹X,XXX today based on ₹20k monthly limit)
+        - SIP Advice:** (Allocate exactly the table's ₹ amounts within the ₹{budget} monthly limit)
+        - If a CHANGES section is present this is an intraday alert: lead with <b>⚡ WHAT CHANGED</b>, one line per
+          change, and cover only the tickers listed; the TOTAL line is still the whole portfolio's deployment.
+        """
+
+        # Dynamic Audit: compact, token-budgeted tables instead of pretty-printed JSON
+        user_content = PayloadBuilder.build(prices, news, scores, events=events, focus=focus)
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+
+    @classmethod
+    def render_numbers_only(cls, scores, events=None):
+        """LLM-free report: the computed table is the whole decision."""
+        changes = ""
+        if events:
+            changes = "⚡ WHAT CHANGED\n" + "\n".join(PayloadBuilder._event_line(e) for e in events) + "\n\n"
+        return (
+            "🚀 SIP ALLOCATION SUMMARY (numbers only)\n"
+            f"Monthly limit: ₹{scores['budget']:,}\n\n"
+            f"{changes}{ScoringEngine.render_table(scores)}"
+        )
+
+    @classmethod
+    def _cache_key(cls, prices, news, budget=None, events=None):
         """
+        Content hash of the decision inputs. Per-ticker fetch timestamps are
+        dropped so an unchanged market snapshot hashes the same across ticks.
+        """
+        stable_prices = prices
+        if isinstance(prices, dict) and isinstance(prices.get("metrics"), dict):
+            stable_prices = dict(prices)
+            stable_prices["metrics"] = {
+                t: ({k: v for k, v in m.items() if k != "timestamp"} if isinstance(m, dict) else m)
+                for t, m in prices["metrics"].items()
+            }
+        blob = json.dumps(
+            {"prices": stable_prices, "news": news, "prompt": cls.PROMPT_VERSION,
+             "model": cls.MODEL, "budget": budget or cls.TOTAL_BUDGET, "events": events or []},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _load_cache(cls):
+        if not os.path.exists(cls.CACHE_FILE): return {}
+        try:
+            with open(cls.CACHE_FILE, 'r') as f: return json.load(f)
+        except Exception as e:
+            logger.error(f"❌ Brain cache unreadable, ignoring: {e}")
+            return {}
+
+    @classmethod
+    def _save_cache(cls, cache):
+        # Keep only the most recent decisions; one entry per distinct input set
+        entries = sorted(cache.items(), key=lambda kv: kv[1].get("created_at", ""), reverse=True)
+        cache = dict(entries[:cls.CACHE_MAX_ENTRIES])
+        os.makedirs(os.path.dirname(cls.CACHE_FILE), exist_ok=True)
+        tmp = cls.CACHE_FILE + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, cls.CACHE_FILE)  # Readers never see a half-written file
+
+    @classmethod
+    def latest_decision(cls):
+        """Most recent cached decision text, or None. Lets notify-only runs skip the audit."""
+        cache = cls._load_cache()
+        if not cache:
+            return None
+        latest = max(cache.values(), key=lambda e: e.get("created_at", ""))
+        return latest.get("response")
+
+    @classmethod
+    def _store_decision(cls, cache_key, response_text):
+        # Concurrent portfolio audits share the file: re-read under the lock so no entry is lost
+        with cls._cache_lock:
+            cache = cls._load_cache()
+            cache[cache_key] = {"response": response_text, "created_at": datetime.now().isoformat()}
+            cls._save_cache(cache)
 
-        # Dynamic Audit: Ensuring input data is focused on 'Trusted Decisions'
-        user_content = f"""
-        INPUT DATA:
-        Tickers (1Y Structural Audit): {json.dumps(prices, indent=2)}
-        News (Strategic Feed): {json.dumps(news, indent=2)}
-        
-        Apply the SIP Alpha Framework.
-        Determine the Buy/Sell/Hold action and specific fractional quantities for TODAY.
+    @classmethod
+    def run_audit(cls, prices=None, news=None, budget=None, events=None, focus=None):
+        """
+        Single-inference audit. Returns the decision text, or None on failure.
+        Unchanged inputs are served from the response cache with zero model calls.
+        prices/news: in-memory snapshots (daemon mode); read from disk when omitted.
+        budget: monthly SIP amount for this portfolio (defaults to TOTAL_BUDGET).
+        events/focus: ChangeDetector events and the tickers they touch; the
+        payload then covers only those tickers (focus None = every ticker).
+        Safe to call from several threads; model calls share the Groq rate limiter.
         """
+        if prices is None:
+            prices = cls._read_prices()
+        if news is None:
+            news = cls._read_json(cls.NEWS_FILE)
+
+        scores = cls.score(prices, news, budget)
+        if cls.MODE == "numbers":
+            logger.info("🧮 BRAIN_MODE=numbers: skipping LLM narration.")
+            return cls.render_numbers_only(scores, events)
 
+        cache_key = cls._cache_key(prices, news, budget, events)
+        cache = cls._load_cache()
+        if cache_key in cache:
+            logger.info(f"♻️ Inputs unchanged (key {cache_key[:12]}), reusing cached decision.")
+            Metrics.incr("brain.cache_hits")
+            return cache[cache_key]["response"]
+
+        # Validate Environment
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            logger.error("❌ GROQ_API_KEY missing from environment.")
+            return None
+
+        messages = cls.prepare_payload(prices, news, scores, budget, events, focus)
+        estimated = sum(PayloadBuilder.estimate_tokens(m["content"]) for m in messages) + cls.MAX_TOKENS
+        waited = cls._request_bucket.acquire() + cls._token_bucket.acquire(estimated)
+        if waited > 0:
+            logger.info(f"⏳ Waited {waited:.1f}s for Groq quota.")
+            Metrics.incr("llm.rate_limited_wait_ms", int(waited * 1000))
         try:
+            from groq import Groq  # Heavy SDK import, only paid on a cache miss
+            client = Groq(api_key=api_key)
             logger.info("📡 Sending data to LLaMA 3.3 for decision mapping...")
-            response = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.1 # Disciplined, non-creative output
-            )
-            
+            with Metrics.span("brain.llm"):
+                response = client.chat.completions.create(
+                    messages=messages,
+                    model=cls.MODEL,
+                    temperature=0.1, # Disciplined, non-creative output
+                    max_tokens=cls.MAX_TOKENS
+                )
+            Metrics.incr("llm.calls")
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                Metrics.incr("llm.prompt_tokens", usage.prompt_tokens or 0)
+                Metrics.incr("llm.completion_tokens", usage.completion_tokens or 0)
+            response_text = response.choices[0].message.content
             logger.info("✅ Decision Layer output received.")
-            return response.choices[0].message.content
-
         except Exception as e:
             logger.error(f"❌ Groq Inference Failed: {str(e)}")
-            return f"CRITICAL: SIP Engine Logic Failure - {str(e)}"
\ No newline at end of file
+            return None
+
+        if response_text:
+            cls._store_decision(cache_key, response_text)
+        return response_text
@@ -0,0 +1,227 @@
+# scripts/change_detector.py
+import json
+import os
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+from scripts.news_store import NewsStore
+from scripts.scoring import ScoringEngine
+from scripts.utils import Metrics, get_logger
+
+logger = get_logger("SIP_Change_Detector")
+
+
+class ChangeDetector:
+    """
+    Decides whether a tick is worth a model call.
+    1. STATE_FILE holds, per portfolio, the last *reported* view per ticker
+       (structure, EMA50 side, margins) plus the critical stories already sent
+    2. diff() compares the fresh snapshot and news against it and returns
+       material events only; everything else is a no-op tick
+    3. commit() moves a portfolio's baseline forward once its events were
+       delivered, so a failed audit or send is retried on the next tick
+    A daily digest (full audit) goes out after DIGEST_TIME even on quiet days.
+    """
+    STATE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "change_state.json")
+    ENABLED = os.getenv("CHANGE_DETECTION", "1") != "0"
+
+    STRUCTURE_FLIP = "STRUCTURE_FLIP"
+    EMA50_CROSS = "EMA50_CROSS"
+    MARGIN_REVISION = "MARGIN_REVISION"
+    CRITICAL_NEWS = "CRITICAL_NEWS"
+
+    # Margin move (as a fraction, 0.005 = 0.5pp) that counts as a revision
+    MARGIN_DELTA = float(os.getenv("CHANGE_MARGIN_DELTA", "0.005"))
+    # Price must clear EMA50 by this fraction before a cross counts (no flapping on the line)
+    EMA_BAND = float(os.getenv("CHANGE_EMA_BAND", "0.005"))
+    SEEN_NEWS_MAX = 500
+
+    TZ = ZoneInfo("Asia/Kolkata")
+    TRADING_DAYS = range(0, 5)
+    # "HH:MM" IST; the first tick after it sends the full audit. "off" disables.
+    DIGEST_TIME = os.getenv("DIGEST_TIME", "15:15")
+
+    @classmethod
+    def load_state(cls):
+        if not os.path.exists(cls.STATE_FILE):
+            return None
+        try:
+            with open(cls.STATE_FILE, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"❌ Change state unreadable, treating as first run: {e}")
+            return None
+
+    @classmethod
+    def save_state(cls, state):
+        os.makedirs(os.path.dirname(cls.STATE_FILE), exist_ok=True)
+        tmp = cls.STATE_FILE + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, cls.STATE_FILE)
+
+    @staticmethod
+    def _view(m):
+        """The fields a report depends on, as stored in the baseline."""
+        return {
+            "structure": m.get("market_structure", ""),
+            "bull": bool(m.get("is_structural_bull")),
+            "margins": float(m.get("margins") or 0.0),
+        }
+
+    @classmethod
+    def _ticker_events(cls, symbol, m, base):
+        events = []
+        view = cls._view(m)
+        if view["structure"] != base.get("structure"):
+            events.append({"type": cls.STRUCTURE_FLIP, "symbol": symbol,
+                           "before": base.get("structure"), "after": view["structure"]})
+        if view["bull"] != base.get("bull"):
+            ema = m.get("ema_50") or 0.0
+            gap = abs((m.get("price") or 0.0) / ema - 1.0) if ema else 0.0
+            if gap >= cls.EMA_BAND:
+                events.append({"type": cls.EMA50_CROSS, "symbol": symbol,
+                               "before": "above" if base.get("bull") else "below",
+                               "after": "above" if view["bull"] else "below"})
+        if abs(view["margins"] - float(base.get("margins") or 0.0)) >= cls.MARGIN_DELTA:
+            events.append({"type": cls.MARGIN_REVISION, "symbol": symbol,
+                           "before": f"{float(base.get('margins') or 0.0) * 100:.1f}%",
+                           "after": f"{view['margins'] * 100:.1f}%"})
+        return events
+
+    @classmethod
+    def diff(cls, prices, news, state):
+        """Material events between the baseline and the fresh snapshot/news, in a stable order."""
+        metrics = prices.get("metrics", {}) if isinstance(prices, dict) else {}
+        baseline = state.get("tickers", {})
+        events = []
+        for symbol, m in metrics.items():
+            # Tickers without data, or not yet in the baseline, have nothing to compare against
+            if isinstance(m, dict) and symbol in baseline:
+                events.extend(cls._ticker_events(symbol, m, baseline[symbol]))
+
+        seen = set(state.get("critical_news", []))
+        bases = {ScoringEngine.base_symbol(s): s for s in metrics}
+        for item in news if isinstance(news, list) else []:
+            if not item.get("is_critical") or not item.get("link"):
+                continue
+            link_hash = NewsStore.link_hash(item["link"])
+            if link_hash in seen:
+                continue
+            seen.add(link_hash)
+            tagged = ScoringEngine.item_tickers(item, list(bases))
+            symbols = [bases[b] for b in tagged if b in bases]
+            if tagged and not symbols:
+                continue  # About tickers nobody watches
+            # Untagged critical stories are sector-wide: symbol None reaches every portfolio
+            for symbol in symbols or [None]:
+                events.append({"type": cls.CRITICAL_NEWS, "symbol": symbol, "before": None,
+                               "after": " ".join(item.get("title", "").split()), "link_hash": link_hash})
+        return events
+
+    @classmethod
+    def digest_due(cls, state, now=None):
+        if cls.DIGEST_TIME.lower() == "off":
+            return False
+        now = now or datetime.now(cls.TZ)
+        hour, minute = (int(x) for x in cls.DIGEST_TIME.split(":"))
+        return (now.weekday() in cls.TRADING_DAYS and now.time() >= dtime(hour, minute)
+                and state.get("last_digest") != now.date().isoformat())
+
+    @classmethod
+    def _plan_portfolio(cls, base, prices, news, now):
+        """One watchlist's events, digest flag and the baseline to keep once it was delivered."""
+        first_run = base is None
+        base = base or {}
+        events = [] if first_run else cls.diff(prices, news, base)
+        digest_due = cls.digest_due(base, now)
+        digest = first_run or digest_due
+
+        current = {s: cls._view(m) for s, m in prices["metrics"].items() if isinstance(m, dict)}
+        if digest:
+            # A full audit reports everything, so the whole snapshot becomes the baseline
+            tickers = {**base.get("tickers", {}), **current}
+        else:
+            # Only what was reported moves; sub-threshold drift keeps accumulating
+            tickers = dict(base.get("tickers", {}))
+            for symbol, view in current.items():
+                tickers.setdefault(symbol, view)
+            fields = {cls.STRUCTURE_FLIP: "structure", cls.EMA50_CROSS: "bull", cls.MARGIN_REVISION: "margins"}
+            for event in events:
+                if event["type"] in fields:
+                    field = fields[event["type"]]
+                    tickers[event["symbol"]] = {**tickers[event["symbol"]], field: current[event["symbol"]][field]}
+
+        seen = base.get("critical_news", []) + [e["link_hash"] for e in events if e["type"] == cls.CRITICAL_NEWS]
+        if first_run and isinstance(news, list):
+            # Stories already on the list at bootstrap are covered by the full audit
+            seen += [NewsStore.link_hash(i["link"]) for i in news if i.get("is_critical") and i.get("link")]
+        return {
+            "events": events,
+            "digest": digest,
+            "state": {
+                "tickers": tickers,
+                "critical_news": list(dict.fromkeys(seen))[-cls.SEEN_NEWS_MAX:],
+                "last_digest": now.date().isoformat() if digest_due else base.get("last_digest"),
+                "updated_at": now.isoformat(),
+            },
+        }
+
+    @classmethod
+    def plan(cls, prices, news, portfolios, now=None):
+        """
+        Returns {"portfolios": {name: {"events", "digest", "state"}}, "events",
+        "digest", "state"} for this tick, or None when detection is disabled
+        (callers then run the full audit as before). Each portfolio has its own
+        baseline, so a failed send to one never re-alerts the others.
+        "digest" True means a full audit: the daily digest, or a portfolio with
+        no baseline yet. Top-level events/digest aggregate every portfolio.
+        """
+        if not cls.ENABLED:
+            return None
+        now = now or datetime.now(cls.TZ)
+        metrics = prices.get("metrics", {}) if isinstance(prices, dict) else {}
+        with Metrics.span("change.detect"):
+            state = cls.load_state() or {}
+            baselines = state.get("portfolios", {})
+            per_portfolio = {}
+            for portfolio in portfolios:
+                scoped = {"metrics": {t: metrics[t] for t in portfolio["tickers"] if t in metrics}}
+                per_portfolio[portfolio["name"]] = cls._plan_portfolio(
+                    baselines.get(portfolio["name"]), scoped, news, now
+                )
+
+        events = [e for p in per_portfolio.values() for e in p["events"]]
+        digest = [name for name, p in per_portfolio.items() if p["digest"]]
+        if events or digest:
+            kinds = {}
+            for event in events:
+                kinds[event["type"]] = kinds.get(event["type"], 0) + 1
+            logger.info(f"🔔 {len(events)} material events {kinds or ''}"
+                        f"{f' + full audit for {len(digest)} portfolios' if digest else ''}.")
+            Metrics.incr("change.events", len(events))
+        else:
+            logger.info("😴 No material change since the last report.")
+            Metrics.incr("change.quiet_ticks")
+        return {"portfolios": per_portfolio, "events": events, "digest": bool(digest), "state": state}
+
+    @classmethod
+    def commit(cls, plan, delivered=None):
+        """
+        Persists the new baseline of every portfolio in delivered (names; None
+        = all). The others keep their old baseline and retry on the next tick.
+        """
+        if not plan:
+            return
+        names = plan["portfolios"] if delivered is None else delivered
+        baselines = dict(plan["state"].get("portfolios", {}))
+        for name in names:
+            if name in plan["portfolios"]:
+                baselines[name] = plan["portfolios"][name]["state"]
+        cls.save_state({**plan["state"], "portfolios": baselines})
+
+    @staticmethod
+    def focus(events):
+        """Tickers an incremental payload covers, or None when a sector-wide event needs them all."""
+        if any(e["symbol"] is None for e in events):
+            return None
+        return list(dict.fromkeys(e["symbol"] for e in events))
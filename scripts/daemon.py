@@ -0,0 +1,153 @@
+# scripts/daemon.py
+import signal
+import time
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+
+from scripts.change_detector import ChangeDetector
+from scripts.news_api import NewsService
+from scripts.portfolios import PortfolioService
+from scripts.stock_api import StockService
+from scripts.streaming import StreamingEngine
+from scripts.utils import Metrics, get_logger
+
+logger = get_logger("StrategicWatcher_Daemon")
+
+
+class StrategicDaemon:
+    """
+    Resident scheduler: one warm process instead of three cold starts per tick.
+    Imports, HTTP sessions, the bar cache and the latest snapshots stay in
+    memory; price/quotes/news run on their own intervals during market hours
+    and still write the same data/*.json files for compatibility. Every data
+    refresh goes through ChangeDetector; the brain and notifier only wake for
+    material events or the daily digest.
+    """
+    TZ = ZoneInfo("Asia/Kolkata")
+    MARKET_OPEN = dtime(9, 15)
+    MARKET_CLOSE = dtime(15, 30)
+    TRADING_DAYS = range(0, 5)  # Monday to Friday
+
+    # Seconds between runs of each stage
+    INTERVALS = {
+        "price": 30 * 60,
+        "quotes": 60,      # O(1) streaming indicator update per ticker
+        "news": 15 * 60,
+        "brain": 5 * 60,   # Minimum gap between model wakeups; detection itself runs every refresh
+    }
+    TICK_SECONDS = 15
+
+    def __init__(self):
+        self.last_run = {stage: float("-inf") for stage in self.INTERVALS}  # Everything due on start
+        self.prices = None        # Latest price_list snapshot
+        self.news = None          # Latest top-K news view
+        self.last_decisions = {}  # {portfolio name: decision text}
+        self.pending_plan = False  # Events detected but not yet delivered
+        self.portfolios = PortfolioService.load()
+        self.universe = PortfolioService.union_tickers(self.portfolios)
+        self._running = True
+
+    @classmethod
+    def market_open(cls, now=None):
+        now = now or datetime.now(cls.TZ)
+        return now.weekday() in cls.TRADING_DAYS and cls.MARKET_OPEN <= now.time() <= cls.MARKET_CLOSE
+
+    def _due(self, stage, now):
+        return now - self.last_run[stage] >= self.INTERVALS[stage]
+
+    def _run_stage(self, stage, fn):
+        started = time.monotonic()
+        try:
+            with Metrics.span(f"stage.{stage}"):
+                result = fn()
+            logger.info(f"⏱️ Stage '{stage}' finished in {time.monotonic() - started:.2f}s.")
+            return result
+        except Exception as e:
+            logger.error(f"💥 Stage '{stage}' failed: {e}", exc_info=True)
+            return None
+        finally:
+            self.last_run[stage] = time.monotonic()
+
+    def run_cycle(self):
+        """Runs every stage that is due. Safe to call on any schedule."""
+        now = time.monotonic()
+        refreshed = False
+
+        if self._due("price", now):
+            prices = self._run_stage("price", lambda: StockService.update_prices(self.universe))
+            if prices:
+                self.prices = prices
+                refreshed = True
+                # Bar cache was just refreshed; reseed streaming state from it on the next poll
+                StreamingEngine.reset()
+        elif self._due("quotes", now) and self.prices:
+            live = self._run_stage("quotes", lambda: StreamingEngine.poll(self.universe))
+            if live:
+                self._apply_live(live)
+                refreshed = True
+        if self._due("news", now):
+            news = self._run_stage("news", lambda: NewsService.fetch_and_filter(self.universe))
+            if news is not None:
+                self.news = news
+                refreshed = True
+
+        if (refreshed or self.pending_plan) and self.prices and self._due("brain", now):
+            self._react()
+
+    def _react(self):
+        """Diffs the in-memory snapshots; audits and notifies only what changed."""
+        plan = self._run_stage("detect", lambda: ChangeDetector.plan(self.prices, self.news, self.portfolios))
+        if plan is not None and not plan["events"] and not plan["digest"]:
+            self.pending_plan = False
+            return
+        decisions = self._run_stage(
+            "brain", lambda: PortfolioService.run_audits(self.portfolios, prices=self.prices, news=self.news, plan=plan)
+        )
+        # Notify stage: runs once per produced set of decisions
+        if decisions and any(decisions.values()):
+            self.last_decisions.update(decisions)
+            sent = self._run_stage("notify", lambda: PortfolioService.deliver(self.portfolios, decisions)) or {}
+            ChangeDetector.commit(plan, [name for name, ok in sent.items() if ok])
+            if sent and all(sent.values()):
+                self.pending_plan = False
+                return
+        # Undelivered events stay in the diff; retry once the brain interval allows
+        self.pending_plan = True
+
+    def _apply_live(self, live):
+        """Overlays streaming price/EMA/structure on the last full snapshot; fundamentals stay."""
+        metrics = dict(self.prices.get("metrics", {}))
+        for symbol, m in live.items():
+            current = metrics.get(symbol)
+            if not m or not isinstance(current, dict):
+                continue
+            metrics[symbol] = {
+                **current,
+                "price": round(m["price"], 2),
+                "ema_50": round(m["ema_50"], 2),
+                "is_structural_bull": bool(m["is_structural_bull"]),
+                "market_structure": m["market_structure"],
+                "timestamp": datetime.now().isoformat(),
+            }
+        self.prices = {**self.prices, "metrics": metrics}
+
+    def stop(self, *_):
+        logger.info("🛑 Shutdown requested, finishing current cycle...")
+        self._running = False
+
+    def run_forever(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info("🟢 Strategic daemon started.")
+        while self._running:
+            if self.market_open():
+                self.run_cycle()
+                if Metrics.snapshot()["spans"]:
+                    Metrics.flush("daemon_cycle")
+            time.sleep(self.TICK_SECONDS)
+        StreamingEngine.save()
+        logger.info("👋 Strategic daemon stopped.")
+
+
+if __name__ == "__main__":
+    StrategicDaemon().run_forever()
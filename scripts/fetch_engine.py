@@ -0,0 +1,160 @@
+# scripts/fetch_engine.py
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from scripts.utils import Metrics, get_logger
+
+logger = get_logger("SIP_Fetch_Engine")
+
+# yfinance drags in pandas and friends (~0.5s); resolved on first request.
+# Tests and benchmarks may assign a stand-in module here before that.
+yf = None
+
+
+def _yfinance():
+    global yf
+    if yf is None:
+        import yfinance
+        yf = yfinance
+    return yf
+
+
+class FetchEngine:
+    """
+    Bounded-concurrency market data fetcher.
+    1. History: universe split into multi-ticker batches, one yf.download per batch
+    2. Fundamentals: ticker.info lookups fanned out across a thread pool
+    3. Retries: failed batches and missing tickers are retried with exponential backoff
+    """
+    BATCH_SIZE = 50      # Tickers per multi-ticker download request
+    MAX_WORKERS = 4      # Concurrent batch downloads (keeps Yahoo from throttling us)
+    INFO_WORKERS = 8     # Concurrent ticker.info lookups
+    MAX_RETRIES = 3
+    BACKOFF_SECONDS = 1.0
+
+    @classmethod
+    def _backoff(cls, attempt):
+        delay = cls.BACKOFF_SECONDS * (2 ** attempt)
+        time.sleep(delay)
+
+    @classmethod
+    def _download(cls, symbols, **kwargs):
+        """Single multi-ticker request. Returns {symbol: DataFrame} for symbols with data."""
+        raw = _yfinance().download(
+            tickers=list(symbols),
+            group_by="ticker",
+            auto_adjust=True,  # Match Ticker.history() defaults
+            threads=False,     # Concurrency is owned by FetchEngine
+            progress=False,
+            **kwargs
+        )
+        frames = {}
+        if raw is None or raw.empty:
+            return frames
+
+        multi = raw.columns.nlevels > 1
+        for symbol in symbols:
+            if multi:
+                if symbol not in raw.columns.get_level_values(0):
+                    continue
+                df = raw[symbol]
+            else:
+                df = raw
+            df = df.dropna(subset=["Close"])
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+    @classmethod
+    def _download_single(cls, symbol, **kwargs):
+        """Per-ticker retry path for symbols a batch request dropped."""
+        for attempt in range(cls.MAX_RETRIES):
+            try:
+                frames = cls._download([symbol], **kwargs)
+                if symbol in frames:
+                    return frames[symbol]
+            except Exception as e:
+                logger.warning("⚠️ Retry %d/%d failed for %s: %s", attempt + 1, cls.MAX_RETRIES, symbol, e)
+            if attempt < cls.MAX_RETRIES - 1:
+                cls._backoff(attempt)
+        logger.error("❌ Giving up on %s after %d attempts.", symbol, cls.MAX_RETRIES)
+        Metrics.incr("fetch.tickers_failed")
+        return None
+
+    @classmethod
+    def _fetch_batch(cls, batch, **kwargs):
+        with Metrics.span("fetch.batch"):
+            frames = cls._fetch_batch_inner(batch, **kwargs)
+        Metrics.incr("fetch.tickers_received", len(frames))
+        return frames
+
+    @classmethod
+    def _fetch_batch_inner(cls, batch, **kwargs):
+        frames = {}
+        for attempt in range(cls.MAX_RETRIES):
+            try:
+                frames = cls._download(batch, **kwargs)
+                break
+            except Exception as e:
+                logger.warning("⚠️ Batch of %d failed (attempt %d): %s", len(batch), attempt + 1, e)
+                if attempt < cls.MAX_RETRIES - 1:
+                    cls._backoff(attempt)
+
+        missing = [s for s in batch if s not in frames]
+        for symbol in missing:
+            df = cls._download_single(symbol, **kwargs)
+            if df is not None:
+                frames[symbol] = df
+        return frames
+
+    @classmethod
+    def fetch_history(cls, symbols, **kwargs):
+        """
+        Fetches OHLCV history for the whole universe.
+        kwargs are forwarded to yf.download (e.g. period="1y" or start=...).
+        Wall time scales with the slowest batch, not the number of tickers.
+        """
+        symbols = list(symbols)
+        batches = [symbols[i:i + cls.BATCH_SIZE] for i in range(0, len(symbols), cls.BATCH_SIZE)]
+        logger.info(f"📡 Fetching history for {len(symbols)} tickers in {len(batches)} batches...")
+
+        results = {}
+        if not batches:
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(cls.MAX_WORKERS, len(batches))) as pool:
+            futures = [pool.submit(cls._fetch_batch, batch, **kwargs) for batch in batches]
+            for future in as_completed(futures):
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    logger.error(f"❌ Batch worker crashed: {e}")
+
+        logger.info(f"✅ History received for {len(results)}/{len(symbols)} tickers.")
+        return results
+
+    @classmethod
+    def _fetch_info_single(cls, symbol):
+        for attempt in range(cls.MAX_RETRIES):
+            try:
+                with Metrics.span("fetch.info"):
+                    return _yfinance().Ticker(symbol).info or {}
+            except Exception as e:
+                logger.warning("⚠️ info lookup %d/%d failed for %s: %s", attempt + 1, cls.MAX_RETRIES, symbol, e)
+                if attempt < cls.MAX_RETRIES - 1:
+                    cls._backoff(attempt)
+        return {}
+
+    @classmethod
+    def fetch_info(cls, symbols):
+        """Runs ticker.info lookups in parallel. Returns {symbol: info dict}."""
+        symbols = list(symbols)
+        results = {}
+        if not symbols:
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(cls.INFO_WORKERS, len(symbols))) as pool:
+            futures = {pool.submit(cls._fetch_info_single, s): s for s in symbols}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
@@ -0,0 +1,98 @@
+# scripts/fundamentals_cache.py
+import json
+import os
+from datetime import datetime, timedelta
+from scripts.fetch_engine import FetchEngine
+from scripts.utils import get_logger
+
+logger = get_logger("SIP_Fundamentals_Cache")
+
+
+class FundamentalsCache:
+    """
+    Persistent TTL cache for the ticker.info fields the pipeline actually reads.
+    Margins/debt only move on quarterly results, so intraday runs serve them from
+    disk. Entries are force-refreshed in the days right after an earnings date.
+    """
+    DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "fundamentals_cache.json")
+    FIELDS = ["debtToEquity", "profitMargins", "earningsTimestamp"]
+
+    TTL_DAYS = float(os.getenv("FUNDAMENTALS_TTL_DAYS", "30"))
+    EVICT_AFTER_DAYS = float(os.getenv("FUNDAMENTALS_EVICT_DAYS", "90"))
+    # After results land, re-pull at most daily for this many days (yfinance lags)
+    POST_EARNINGS_DAYS = 3
+
+    @classmethod
+    def _load_storage(cls):
+        if not os.path.exists(cls.DATA_FILE): return {}
+        try:
+            with open(cls.DATA_FILE, 'r') as f: return json.load(f)
+        except Exception as e:
+            logger.error(f"❌ Fundamentals cache unreadable, starting fresh: {e}")
+            return {}
+
+    @classmethod
+    def _save_storage(cls, data):
+        os.makedirs(os.path.dirname(cls.DATA_FILE), exist_ok=True)
+        with open(cls.DATA_FILE, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    @classmethod
+    def _is_fresh(cls, entry, now):
+        fetched_at = datetime.fromisoformat(entry["fetched_at"])
+        if now - fetched_at > timedelta(days=cls.TTL_DAYS):
+            return False
+
+        # Earnings window: results are out but our snapshot may pre-date them
+        earnings_ts = entry.get("earningsTimestamp")
+        if earnings_ts:
+            earnings_at = datetime.fromtimestamp(earnings_ts)
+            window_end = earnings_at + timedelta(days=cls.POST_EARNINGS_DAYS)
+            if earnings_at <= now <= window_end and now - fetched_at > timedelta(days=1):
+                return False
+            if fetched_at < earnings_at <= now:
+                return False
+        return True
+
+    @classmethod
+    def _evict(cls, cache, now):
+        cutoff = now - timedelta(days=cls.EVICT_AFTER_DAYS)
+        stale = [s for s, e in cache.items() if datetime.fromisoformat(e["fetched_at"]) < cutoff]
+        for symbol in stale:
+            del cache[symbol]
+        if stale:
+            logger.info(f"🧹 Evicted {len(stale)} stale fundamentals entries.")
+        return len(stale)
+
+    @classmethod
+    def get_many(cls, symbols, force=False):
+        """
+        Returns {symbol: {debtToEquity, profitMargins, earningsTimestamp}}.
+        Only misses (absent, expired or inside an earnings window) hit ticker.info.
+        Set force=True or FUNDAMENTALS_FORCE_REFRESH=1 to bypass the cache.
+        """
+        force = force or os.getenv("FUNDAMENTALS_FORCE_REFRESH") == "1"
+        now = datetime.now()
+        cache = cls._load_storage()
+
+        misses = [s for s in symbols if force or s not in cache or not cls._is_fresh(cache[s], now)]
+        hits = len(symbols) - len(misses)
+        logger.info(f"💾 Fundamentals cache: {hits} hits, {len(misses)} misses.")
+
+        if misses:
+            infos = FetchEngine.fetch_info(misses)
+            for symbol in misses:
+                info = infos.get(symbol) or {}
+                if not info:
+                    # Keep serving the old entry rather than wiping it on a failed lookup
+                    continue
+                entry = {k: info.get(k) for k in cls.FIELDS}
+                entry["fetched_at"] = now.isoformat()
+                cache[symbol] = entry
+
+        evicted = cls._evict(cache, now)
+        # All-hit runs still persist evictions, or dropped tickers would linger forever
+        if misses or evicted:
+            cls._save_storage(cache)
+
+        return {s: cache[s] for s in symbols if s in cache}
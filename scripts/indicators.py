@@ -0,0 +1,128 @@
+# scripts/indicators.py
+import numpy as np
+import pandas as pd
+from scripts.structure import StructureEngine
+from scripts.utils import get_logger
+
+logger = get_logger("SIP_Indicators")
+
+
+class IndicatorEngine:
+    """
+    Vectorized indicator math over aligned (tickers x days) matrices.
+    One pass computes EMAs, the price-vs-EMA50 flag and the HH/HL structure
+    label for the whole universe. Short histories are left-padded with NaN.
+    """
+    BULLISH = StructureEngine.BULLISH
+    BEARISH = StructureEngine.BEARISH
+    RANGE = StructureEngine.RANGE
+
+    STRUCTURE_WINDOW = StructureEngine.TIMEFRAMES[StructureEngine.PRIMARY]  # Approx 3 months of trading days
+    MIN_BARS = 130         # 130 days ~ 6 months
+
+    @classmethod
+    def stack(cls, frames):
+        """
+        Aligns {symbol: OHLCV DataFrame} on the union of trading dates.
+        Returns (symbols, dates, close, high, low) with matrices shaped (tickers x days).
+        """
+        symbols = list(frames)
+        if not symbols:
+            empty = np.empty((0, 0))
+            return symbols, pd.DatetimeIndex([]), empty, empty, empty
+
+        # yfinance bars are stamped at local (IST) midnight; .values on a tz-aware
+        # index is UTC, which would shift every bar to the previous calendar day
+        indexes = {s: cls._local_index(frames[s].index) for s in symbols}
+        dates = pd.DatetimeIndex(np.unique(np.concatenate([indexes[s].values for s in symbols])))
+        close = np.full((len(symbols), len(dates)), np.nan)
+        high = np.full_like(close, np.nan)
+        low = np.full_like(close, np.nan)
+        for i, s in enumerate(symbols):
+            df = frames[s]
+            cols = dates.searchsorted(indexes[s].values)
+            close[i, cols] = df["Close"].to_numpy(dtype="float64")
+            high[i, cols] = df["High"].to_numpy(dtype="float64")
+            low[i, cols] = df["Low"].to_numpy(dtype="float64")
+        return symbols, dates, close, high, low
+
+    @staticmethod
+    def _local_index(index):
+        """The index as naive wall-clock timestamps (exchange-local dates)."""
+        return index.tz_localize(None) if getattr(index, "tz", None) is not None else index
+
+    @staticmethod
+    def ema(matrix, span):
+        """
+        Recursive EMA (pandas ewm(span, adjust=False) semantics) per row.
+        Each row seeds on its first valid value; NaN gaps carry the last EMA forward.
+        The loop runs over days, every ticker is updated in the same vector op.
+        """
+        alpha = 2.0 / (span + 1.0)
+        out = np.full(matrix.shape, np.nan)
+        prev = np.full(matrix.shape[0], np.nan)
+        for t in range(matrix.shape[1]):
+            x = matrix[:, t]
+            step = alpha * x + (1.0 - alpha) * prev
+            prev = np.where(np.isnan(x), prev, np.where(np.isnan(prev), x, step))
+            out[:, t] = prev
+        return out
+
+    @staticmethod
+    def last_valid(matrix):
+        """Last non-NaN value of each row (NaN if the row is empty)."""
+        if matrix.shape[1] == 0:
+            return np.full(matrix.shape[0], np.nan)
+        valid = ~np.isnan(matrix)
+        last_idx = matrix.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+        values = matrix[np.arange(matrix.shape[0]), last_idx]
+        return np.where(valid.any(axis=1), values, np.nan)
+
+    @classmethod
+    def structure(cls, high, low, window=None):
+        """
+        Compares the last `window` bars to the `window` bars before them.
+        Returns an object array of structure labels, one per ticker.
+        """
+        window = window or cls.STRUCTURE_WINDOW
+        recent_high = np.fmax.reduce(high[:, -window:], axis=1, initial=np.nan)
+        recent_low = np.fmin.reduce(low[:, -window:], axis=1, initial=np.nan)
+        prior_high = np.fmax.reduce(high[:, -2 * window:-window], axis=1, initial=np.nan)
+        prior_low = np.fmin.reduce(low[:, -2 * window:-window], axis=1, initial=np.nan)
+
+        # NaN comparisons are False, so tickers without both windows fall to RANGE
+        bullish = (recent_high > prior_high) & (recent_low > prior_low)
+        bearish = (recent_high < prior_high) & (recent_low < prior_low)
+        return np.select([bullish, bearish], [cls.BULLISH, cls.BEARISH], default=cls.RANGE).astype(object)
+
+    @classmethod
+    def compute(cls, close, high, low, dates=None):
+        """
+        Full SIP indicator pass. Returns a dict of per-ticker arrays:
+        price, ema_50, ema_20, is_structural_bull, market_structure, bar_count, valid.
+        With the column dates, also returns "structures": the multi-timeframe
+        StructureEngine output, whose primary timeframe is market_structure.
+        """
+        ema_50 = cls.last_valid(cls.ema(close, 50))
+        # [TECHNICAL DEBT FLAG]: EMA20 is kept for legacy but ignored by Brain
+        ema_20 = cls.last_valid(cls.ema(close, 20))
+        price = cls.last_valid(close)
+        bar_count = np.count_nonzero(~np.isnan(close), axis=1)
+
+        structures = None
+        if dates is not None:
+            structures = StructureEngine.compute(high, low, dates)
+            market_structure = structures[StructureEngine.PRIMARY]["label"]
+        else:
+            market_structure = cls.structure(high, low)
+
+        return {
+            "price": price,
+            "ema_50": ema_50,
+            "ema_20": ema_20,
+            "is_structural_bull": price > ema_50,
+            "market_structure": market_structure,
+            "structures": structures,
+            "bar_count": bar_count,
+            "valid": bar_count >= cls.MIN_BARS,
+        }
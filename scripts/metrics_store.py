@@ -0,0 +1,262 @@
+# scripts/metrics_store.py
+import json
+import os
+from datetime import date, datetime, timedelta
+import numpy as np
+from scripts.structure import StructureEngine
+from scripts.utils import get_logger
+
+logger = get_logger("SIP_Metrics_Store")
+
+
+class MetricsStore:
+    """
+    Append-only time series of per-ticker SIP metrics.
+    1. HISTORY_FILE: fixed-width binary records, one per ticker per snapshot,
+       appended in time order and read back through np.memmap
+    2. INDEX_FILE: symbol, structure-label and timeframe tables the records point into
+    Records are sorted by day and snapshot id, so the latest snapshot and any
+    date range are binary searches over the map; nothing loads the full history.
+    """
+    DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+    HISTORY_FILE = os.path.join(DATA_DIR, "metrics_history.bin")
+    INDEX_FILE = os.path.join(DATA_DIR, "metrics_index.json")
+    # Pre-history snapshots (price_list.json) seed the store on first use
+    LEGACY_FILE = os.path.join(DATA_DIR, "price_list.json")
+
+    DTYPE = np.dtype([
+        ("snapshot", "<u4"),   # Monotonic run id; all tickers of one update share it
+        ("day", "<i4"),        # Days since 1970-01-01 (the date index)
+        ("ts", "<f8"),         # Per-ticker fetch time, epoch seconds
+        ("symbol", "<u4"),     # Row in index["symbols"]
+        ("valid", "u1"),       # 0 = ticker had no usable data ("N/A")
+        ("structure", "u1"),   # Row in index["structures"]
+        ("bull", "u1"),
+        ("price", "<f8"),
+        ("ema_50", "<f8"),
+        ("margins", "<f8"),
+        ("debt_ratio", "<f8"),
+        # Multi-timeframe structure, slot i = index["timeframes"][i]
+        ("tf_structure", "u1", (4,)),  # Row in index["structures"], NO_CODE if absent
+        ("tf_since", "<i4", (4,)),     # Day of the last flip, NO_DAY if none
+    ])
+    MAX_TIMEFRAMES = 4
+    NO_CODE = 255
+    NO_DAY = -1
+    EPOCH = date(1970, 1, 1)
+
+    @classmethod
+    def _load_index(cls):
+        if not os.path.exists(cls.INDEX_FILE):
+            return {"symbols": [], "structures": [], "timeframes": []}
+        with open(cls.INDEX_FILE, 'r') as f:
+            index = json.load(f)
+        index.setdefault("timeframes", [])
+        return index
+
+    @classmethod
+    def _save_index(cls, index):
+        os.makedirs(os.path.dirname(cls.INDEX_FILE), exist_ok=True)
+        tmp = cls.INDEX_FILE + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp, cls.INDEX_FILE)
+
+    @classmethod
+    def _day(cls, date_str):
+        return (date.fromisoformat(date_str[:10]) - cls.EPOCH).days
+
+    @classmethod
+    def _date_str(cls, day):
+        return (cls.EPOCH + timedelta(days=int(day))).isoformat()
+
+    @classmethod
+    def _records(cls):
+        """Read-only memmap over every complete record (a torn tail write is ignored)."""
+        if not os.path.exists(cls.HISTORY_FILE):
+            return np.empty(0, dtype=cls.DTYPE)
+        count = os.path.getsize(cls.HISTORY_FILE) // cls.DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=cls.DTYPE)
+        return np.memmap(cls.HISTORY_FILE, dtype=cls.DTYPE, mode="r", shape=(count,))
+
+    @staticmethod
+    def _code(table, value):
+        try:
+            return table.index(value)
+        except ValueError:
+            table.append(value)
+            return len(table) - 1
+
+    @classmethod
+    def append_snapshot(cls, entry):
+        """Appends one {"date", "metrics": {symbol: dict | "N/A"}} snapshot. Returns rows written."""
+        cls._migrate_legacy()
+        return cls._append(entry)
+
+    @classmethod
+    def _append(cls, entry):
+        metrics = entry.get("metrics") or {}
+        if not metrics:
+            return 0
+        records = cls._records()
+        snapshot = int(records["snapshot"][-1]) + 1 if len(records) else 0
+        day = cls._day(entry["date"])
+        if len(records) and day < int(records["day"][-1]):
+            raise ValueError(f"Snapshot {entry['date']} is older than the last stored day")
+
+        index = cls._load_index()
+        rows = np.zeros(len(metrics), dtype=cls.DTYPE)
+        rows["snapshot"] = snapshot
+        rows["day"] = day
+        rows["tf_structure"] = cls.NO_CODE
+        rows["tf_since"] = cls.NO_DAY
+        for i, (symbol, m) in enumerate(metrics.items()):
+            row = rows[i]
+            row["symbol"] = cls._code(index["symbols"], symbol)
+            if not isinstance(m, dict):
+                row["ts"] = np.nan
+                row["price"] = row["ema_50"] = row["margins"] = row["debt_ratio"] = np.nan
+                continue
+            row["valid"] = 1
+            row["ts"] = datetime.fromisoformat(m["timestamp"]).timestamp() if m.get("timestamp") else np.nan
+            row["structure"] = cls._code(index["structures"], m.get("market_structure", ""))
+            row["bull"] = bool(m.get("is_structural_bull"))
+            row["price"] = m.get("price") or 0.0
+            row["ema_50"] = m.get("ema_50") or 0.0
+            row["margins"] = m.get("margins") or 0.0
+            row["debt_ratio"] = m.get("debt_ratio") or 0.0
+            for tf, value in (m.get("timeframes") or {}).items():
+                slot = cls._code(index["timeframes"], tf)
+                if slot >= cls.MAX_TIMEFRAMES:
+                    index["timeframes"].pop()
+                    continue
+                row["tf_structure"][slot] = cls._code(index["structures"], value.get("structure", ""))
+                if value.get("since"):
+                    row["tf_since"][slot] = cls._day(value["since"])
+
+        # Index first: a crash between the two writes leaves unused labels, never dangling codes
+        cls._save_index(index)
+        # Cut a torn tail from an interrupted write, or every later record would be misaligned
+        valid_bytes = len(records) * cls.DTYPE.itemsize
+        with open(cls.HISTORY_FILE, 'r+b' if os.path.exists(cls.HISTORY_FILE) else 'wb') as f:
+            f.truncate(valid_bytes)
+            f.seek(0, os.SEEK_END)
+            f.write(rows.tobytes())
+        logger.info(f"🗄️ Stored snapshot #{snapshot} ({len(rows)} tickers) for {entry['date']}.")
+        return len(rows)
+
+    @classmethod
+    def _to_metric(cls, row, index):
+        if not row["valid"]:
+            return "N/A"
+        symbol = index["symbols"][int(row["symbol"])]
+        ts = float(row["ts"])
+        metric = {
+            "symbol": symbol,
+            "price": float(row["price"]),
+            "ema_50": float(row["ema_50"]),
+            "is_structural_bull": bool(row["bull"]),
+            "market_structure": index["structures"][int(row["structure"])],
+            "debt_ratio": float(row["debt_ratio"]),
+            "margins": float(row["margins"]),
+            "timestamp": datetime.fromtimestamp(ts).isoformat() if ts == ts else None,
+        }
+        timeframes = {}
+        for slot, tf in enumerate(index["timeframes"]):
+            code = int(row["tf_structure"][slot])
+            if code != cls.NO_CODE:
+                since = int(row["tf_since"][slot])
+                timeframes[tf] = {"structure": index["structures"][code],
+                                  "since": cls._date_str(since) if since != cls.NO_DAY else None}
+        if timeframes:
+            primary = timeframes.get(StructureEngine.PRIMARY, {})
+            metric["structure_since"] = primary.get("since")
+            metric["timeframes"] = timeframes
+        return metric
+
+    @classmethod
+    def _to_snapshot(cls, rows, index):
+        return {
+            "date": cls._date_str(rows["day"][0]),
+            "metrics": {index["symbols"][int(r["symbol"])]: cls._to_metric(r, index) for r in rows},
+        }
+
+    @classmethod
+    def latest(cls):
+        """Most recent snapshot in price_list.json shape, or {} if nothing is stored."""
+        cls._migrate_legacy()
+        records = cls._records()
+        if not len(records):
+            return {}
+        # Snapshot ids are sorted: one binary search finds where the last run starts
+        start = int(np.searchsorted(records["snapshot"], records["snapshot"][-1], side="left"))
+        return cls._to_snapshot(np.array(records[start:]), cls._load_index())
+
+    @classmethod
+    def last_updated(cls):
+        """Epoch seconds of the newest fetch in the last snapshot, or None if nothing is stored."""
+        records = cls._records()
+        if not len(records):
+            return None
+        start = int(np.searchsorted(records["snapshot"], records["snapshot"][-1], side="left"))
+        ts = records["ts"][start:]
+        ts = ts[~np.isnan(ts)]
+        return float(ts.max()) if len(ts) else None
+
+    @classmethod
+    def range(cls, start=None, end=None):
+        """
+        Zero-copy view of the records with start <= date <= end (ISO strings,
+        inclusive, either side optional). Only the touched pages are read.
+        """
+        records = cls._records()
+        lo = int(np.searchsorted(records["day"], cls._day(start), side="left")) if start else 0
+        hi = int(np.searchsorted(records["day"], cls._day(end), side="right")) if end else len(records)
+        return records[lo:hi]
+
+    @classmethod
+    def history(cls, symbol, start=None, end=None):
+        """[{"date", **metrics}] for one ticker over a date range, oldest first."""
+        index = cls._load_index()
+        if symbol not in index["symbols"]:
+            return []
+        window = cls.range(start, end)
+        rows = window[window["symbol"] == index["symbols"].index(symbol)]
+        out = []
+        for row in rows:
+            metric = cls._to_metric(row, index)
+            if isinstance(metric, dict):
+                out.append({"date": cls._date_str(row["day"]), **metric})
+        return out
+
+    @classmethod
+    def iter_snapshots(cls, start=None, end=None):
+        """Streams whole snapshots in a date range, one at a time."""
+        index = cls._load_index()
+        window = cls.range(start, end)
+        if not len(window):
+            return
+        ids = window["snapshot"]
+        bounds = np.flatnonzero(np.diff(ids)) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(ids)]):
+            yield cls._to_snapshot(np.array(window[lo:hi]), index)
+
+    @classmethod
+    def _migrate_legacy(cls):
+        """One-time seed from the snapshots older runs kept in price_list.json."""
+        if os.path.exists(cls.HISTORY_FILE) or not os.path.exists(cls.LEGACY_FILE):
+            return
+        try:
+            with open(cls.LEGACY_FILE, 'r') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            logger.error(f"❌ Legacy price file unreadable, starting empty history: {e}")
+            legacy = []
+        if isinstance(legacy, dict):
+            legacy = [legacy]
+        legacy = [e for e in legacy if isinstance(e, dict) and e.get("date") and e.get("metrics")]
+        if legacy:
+            logger.info(f"📦 Seeding metrics history from {len(legacy)} legacy price_list.json snapshots.")
+        for entry in sorted(legacy, key=lambda e: e["date"]):
+            cls._append(entry)
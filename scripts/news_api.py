@@ -1,18 +1,14 @@
 # scripts/news_api.py
-import feedparser
 import json
 import os
-import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from scripts.news_matcher import KeywordMatcher
+from scripts.news_store import NewsStore
+from scripts.utils import Metrics, get_logger
 
 # High-Density Logging Setup
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("NewsWatcher_API")
-formatter = logging.Formatter('%(asctime)s - [BLUNT_COEFF: HIGH] - %(message)s')
-handler = logging.StreamHandler()
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+logger = get_logger("NewsWatcher_API")
 
 class NewsService:
     # Portfolio Manager's Curated Feeds (High-Signal Sources)
@@ -29,28 +25,145 @@ class NewsService:
     # Ticker Match: 5pts | High-Impact (Order/Contract): 4pts | Nuclear Context: 3pts
     IMPACT_KEYWORDS = ["ORDER", "CONTRACT", "TENDER", "L1", "MOU", "WIN"]
     NUCLEAR_KEYWORDS = ["SMR", "AERB", "NPCIL", "KUDANKULAM", "FAC", "CRITICALITY"]
+
+    # Company names as they appear in headlines -> ticker
+    TICKER_ALIASES = {
+        "BHARAT HEAVY ELECTRICALS": "BHEL",
+        "MTAR": "MTARTECH",
+        "MTAR TECHNOLOGIES": "MTARTECH",
+        "WALCHANDNAGAR": "WALCHANNAG",
+        "WALCHANDNAGAR INDUSTRIES": "WALCHANNAG",
+        "LARSEN & TOUBRO": "LT",
+        "LARSEN AND TOUBRO": "LT",
+        "L&T": "LT",
+    }
     
-    DATA_FILE = "data/news_list.json"
+    DATA_FILE = NewsStore.TOP_K_FILE  # Top-K relevance view read by the Brain
+    # ETag / Last-Modified per feed, so unchanged feeds come back as 304
+    FEED_STATE_FILE = os.path.join(NewsStore.DATA_DIR, "feed_state.json")
+
+    MAX_WORKERS = 8
+    FEED_TIMEOUT = 10  # Seconds per feed; one slow ministry site can't stall the rest
+    USER_AGENT = "Mozilla/5.0 (StockWatcher RSS Poller)"
+
+    _matcher = None
+    _session = None
+
+    @classmethod
+    def get_matcher(cls):
+        """Compiled once per process; rebuild by resetting _matcher after editing the lists."""
+        if cls._matcher is None:
+            cls._matcher = KeywordMatcher(
+                {"TICKER": cls.TICKERS, "IMPACT": cls.IMPACT_KEYWORDS, "NUCLEAR": cls.NUCLEAR_KEYWORDS},
+                aliases={alias: ("TICKER", t) for alias, t in cls.TICKER_ALIASES.items()},
+                plural_classes=("IMPACT",)
+            )
+        return cls._matcher
+
+    @classmethod
+    def set_tickers(cls, tickers):
+        """Switches the watchlist (exchange-less symbols); the matcher recompiles only on change."""
+        tickers = sorted({t.split(".")[0].upper() for t in tickers})
+        if tickers != sorted(cls.TICKERS):
+            cls.TICKERS = tickers
+            cls._matcher = None
+
+    @classmethod
+    def _get_session(cls):
+        """Keep-alive session reused across feeds and, in daemon mode, across cycles."""
+        if cls._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=cls.MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            cls._session = session
+        return cls._session
+
+    @classmethod
+    def _fetch_feed(cls, source_name, url, state):
+        """Conditional GET for one feed. Returns (entries or None if unchanged, new state)."""
+        with Metrics.span("news.feed", key=source_name):
+            return cls._fetch_feed_inner(source_name, url, state)
 
     @classmethod
-    def fetch_and_filter(cls):
+    def _fetch_feed_inner(cls, source_name, url, state):
+        headers = {"User-Agent": cls.USER_AGENT}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("modified"):
+            headers["If-Modified-Since"] = state["modified"]
+
+        response = cls._get_session().get(url, headers=headers, timeout=cls.FEED_TIMEOUT)
+        if response.status_code == 304:
+            logger.info("💤 %s: not modified since last poll, skipping.", source_name)
+            Metrics.incr("news.feeds_not_modified")
+            return None, state
+        response.raise_for_status()
+
+        import feedparser  # ~0.1s import; only paid when a feed actually changed
+        feed = feedparser.parse(response.content)
+        new_state = {
+            "etag": response.headers.get("ETag"),
+            "modified": response.headers.get("Last-Modified")
+        }
+        return feed.entries, new_state
+
+    @classmethod
+    def _fetch_all(cls, feed_state):
+        """
+        Polls every feed concurrently. Returns {source_name: entries} for feeds
+        that changed; feed_state is updated in place for successful polls.
+        """
+        results = {}
+        pool = ThreadPoolExecutor(max_workers=min(cls.MAX_WORKERS, len(cls.FEEDS)) or 1)
+        futures = {
+            pool.submit(cls._fetch_feed, name, url, feed_state.get(name, {})): name
+            for name, url in cls.FEEDS.items()
+        }
+        # Hard wall-clock cap on top of the per-request socket timeout
+        done, not_done = wait(futures, timeout=cls.FEED_TIMEOUT * 2)
+        for future in not_done:
+            logger.error(f"⏱️ {futures[future]} timed out, skipping this cycle.")
+        for future in done:
+            source_name = futures[future]
+            try:
+                entries, state = future.result()
+                feed_state[source_name] = state
+                if entries is not None:
+                    results[source_name] = entries
+            except Exception as e:
+                logger.error(f"❌ Failed to parse {source_name}: {str(e)}")
+        pool.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    @classmethod
+    def fetch_and_filter(cls, tickers=None):
+        if tickers:
+            cls.set_tickers(tickers)
         logger.info("🔍 [TASK: NEWS AGGREGATION] Scanning for Order Wins and Policy Shifts...")
         
-        existing_news = cls._load_storage()
-        seen_links = {item['link'] for item in existing_news}
-        new_stories_count = 0
+        # Hashed-link index covers every story ever stored, so pruned items stay "seen"
+        seen_hashes = NewsStore.load_seen()
+        new_items = []
 
-        for source_name, url in cls.FEEDS.items():
+        matcher = cls.get_matcher()
+        feed_state = cls._load_feed_state()
+        fetched = cls._fetch_all(feed_state)
+
+        # Score in FEEDS order so ingestion stays deterministic
+        for source_name in cls.FEEDS:
+            if source_name not in fetched:
+                continue
             try:
-                feed = feedparser.parse(url)
-                for entry in feed.entries:
-                    title = entry.title.upper()
-                    
-                    # 1. Scoring Logic
+                for entry in fetched[source_name]:
+                    # 1. Scoring Logic (one word-boundary pass over the title)
+                    hits = matcher.match(entry.title)
                     score = 0
-                    is_ticker_match = any(t in title for t in cls.TICKERS)
-                    is_nuclear_match = any(nk in title for nk in cls.NUCLEAR_KEYWORDS)
-                    is_impact_match = any(ik in title for ik in cls.IMPACT_KEYWORDS)
+                    is_ticker_match = "TICKER" in hits
+                    is_nuclear_match = "NUCLEAR" in hits
+                    is_impact_match = "IMPACT" in hits
 
                     if is_ticker_match: score += 5
                     if is_impact_match: score += 4
@@ -58,7 +171,8 @@ class NewsService:
 
                     # 2. Strategic Threshold
                     # ALLOW if: Direct Ticker news (>=5) OR high-impact Nuclear news (>=4)
-                    if (score >= 4) and entry.link not in seen_links:
+                    link_hash = NewsStore.link_hash(entry.link)
+                    if (score >= 4) and link_hash not in seen_hashes:
                         category = "ORDER_WIN" if (is_ticker_match and is_impact_match) else "STRATEGIC"
                         
                         news_item = {
@@ -67,36 +181,43 @@ class NewsService:
                             "title": entry.title,
                             "link": entry.link,
                             "published": entry.get('published', datetime.now().strftime('%Y-%m-%d %H:%M')),
+                            "tickers": sorted(hits.get("TICKER", ())),
                             "relevance_score": score,
                             "is_critical": score >= 9 # Flag for immediate Brain attention
                         }
-                        existing_news.append(news_item)
-                        seen_links.add(entry.link)
-                        new_stories_count += 1
-                        logger.info(f"📰 [{category}] Score {score}: {entry.title[:60]}...")
+                        new_items.append(news_item)
+                        seen_hashes.add(link_hash)
+                        logger.info("📰 [%s] Score %d: %.60s...", category, score, entry.title)
 
             except Exception as e:
                 logger.error(f"❌ Failed to parse {source_name}: {str(e)}")
 
-        # Technical Debt Pruning: Keep top 80, but SORT by relevance before slicing
-        existing_news = sorted(existing_news, key=lambda x: x.get('relevance_score', 0), reverse=True)
-        if len(existing_news) > 80:
-            logger.info("🧹 Pruning: Retaining top 80 highest-relevance items.")
-            existing_news = existing_news[:80]
+        # Append-only history + bounded top-K view (only new items are touched)
+        NewsStore.append(new_items)
+        top_k = NewsStore.update_top_k(new_items)
+        # Poll time lives inside the state: file mtimes are reset by every git checkout
+        feed_state["polled_at"] = datetime.now().isoformat()
+        cls._save_feed_state(feed_state)
+        logger.info(f"✅ News Cycle Complete. Added {len(new_items)} strategic stories.")
+        return top_k
 
-        cls._save_storage(existing_news)
-        logger.info(f"✅ News Cycle Complete. Added {new_stories_count} strategic stories.")
+    @classmethod
+    def _load_feed_state(cls):
+        if not os.path.exists(cls.FEED_STATE_FILE): return {}
+        try:
+            with open(cls.FEED_STATE_FILE, 'r') as f: return json.load(f)
+        except: return {}
 
     @classmethod
-    def _load_storage(cls):
-        if not os.path.exists(cls.DATA_FILE):
-            os.makedirs(os.path.dirname(cls.DATA_FILE), exist_ok=True)
-            return []
-        with open(cls.DATA_FILE, 'r') as f: return json.load(f)
+    def last_polled(cls):
+        """Epoch seconds of the last completed poll, or None."""
+        polled_at = cls._load_feed_state().get("polled_at")
+        return datetime.fromisoformat(polled_at).timestamp() if polled_at else None
 
     @classmethod
-    def _save_storage(cls, data):
-        with open(cls.DATA_FILE, 'w') as f: json.dump(data, f, indent=2)
+    def _save_feed_state(cls, state):
+        os.makedirs(os.path.dirname(cls.FEED_STATE_FILE), exist_ok=True)
+        with open(cls.FEED_STATE_FILE, 'w') as f: json.dump(state, f, indent=2)
 
 if __name__ == "__main__":
     NewsService.fetch_and_filter()
\ No newline at end of file
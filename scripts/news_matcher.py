@@ -0,0 +1,75 @@
+# scripts/news_matcher.py
+import re
+from scripts.utils import get_logger
+
+logger = get_logger("NewsWatcher_Matcher")
+
+
+class KeywordMatcher:
+    """
+    Single-pass, word-boundary keyword matcher for news titles.
+    All terms compile into one trie-shaped regex, so scanning a title walks
+    shared prefixes once instead of testing every term separately.
+    "LT" no longer hits "RESULT" and "WIN" no longer hits "WINDOW".
+    """
+    # Letters/digits on either side of a hit mean we're inside another word
+    BOUNDARY_BEFORE = r"(?<![A-Z0-9])"
+    BOUNDARY_AFTER = r"(?![A-Z0-9])"
+
+    def __init__(self, classes, aliases=None, plural_classes=()):
+        """
+        classes: {class_name: [terms]}, e.g. {"TICKER": [...], "IMPACT": [...]}
+        aliases: {alias: (class_name, canonical)}, e.g. {"LARSEN & TOUBRO": ("TICKER", "LT")}
+        plural_classes: classes whose terms also match with a trailing S ("ORDERS")
+        """
+        self._lookup = {}
+        for class_name, terms in classes.items():
+            for term in terms:
+                self._add(term, class_name, term.upper())
+                if class_name in plural_classes:
+                    self._add(term + "S", class_name, term.upper())
+        for alias, (class_name, canonical) in (aliases or {}).items():
+            self._add(alias, class_name, canonical.upper())
+
+        body = self._trie_pattern(self._build_trie(self._lookup))
+        self._regex = re.compile(f"{self.BOUNDARY_BEFORE}({body}){self.BOUNDARY_AFTER}")
+        logger.info(f"🧩 Compiled matcher with {len(self._lookup)} terms.")
+
+    def _add(self, term, class_name, canonical):
+        key = self._normalize(term)
+        self._lookup.setdefault(key, set()).add((class_name, canonical))
+
+    @staticmethod
+    def _normalize(text):
+        return " ".join(text.upper().split())
+
+    @staticmethod
+    def _build_trie(terms):
+        trie = {}
+        for term in terms:
+            node = trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[""] = True  # Terminal marker
+        return trie
+
+    @classmethod
+    def _trie_pattern(cls, node):
+        terminal = "" in node
+        branches = [re.escape(ch) + cls._trie_pattern(child)
+                    for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Greedy optional keeps the longest term; backtracks if the boundary fails
+            body = "(?:" + body + ")?"
+        return body
+
+    def match(self, title):
+        """Returns {class_name: set(canonical terms)} for every hit in the title."""
+        hits = {}
+        for m in self._regex.finditer(self._normalize(title)):
+            for class_name, canonical in self._lookup.get(m.group(1), ()):
+                hits.setdefault(class_name, set()).add(canonical)
+        return hits
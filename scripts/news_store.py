@@ -0,0 +1,118 @@
+# scripts/news_store.py
+import hashlib
+import heapq
+import json
+import os
+from scripts.utils import get_logger
+
+logger = get_logger("NewsWatcher_Store")
+
+
+class NewsStore:
+    """
+    Append-only news persistence.
+    1. LOG_FILE: every accepted story, one JSON object per line (full history)
+    2. SEEN_FILE: hashed-link dedup index, one digest per line, never pruned
+    3. TOP_K_FILE: bounded relevance view consumed by the Brain (news_list.json)
+    Ingest cost is proportional to the number of new items, not history size.
+    """
+    DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+    LOG_FILE = os.path.join(DATA_DIR, "news_log.jsonl")
+    SEEN_FILE = os.path.join(DATA_DIR, "news_seen.idx")
+    TOP_K_FILE = os.path.join(DATA_DIR, "news_list.json")
+    TOP_K = 80
+
+    # Resident dedup set for long-running processes, valid while the file size matches
+    _seen = None
+    _seen_size = -1
+
+    @staticmethod
+    def link_hash(link):
+        return hashlib.sha1(link.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def load_seen(cls):
+        """Returns the set of link digests ever ingested."""
+        cls._migrate_legacy()
+        if not os.path.exists(cls.SEEN_FILE):
+            return set()
+        size = os.path.getsize(cls.SEEN_FILE)
+        if cls._seen is None or size != cls._seen_size:
+            with open(cls.SEEN_FILE, 'r') as f:
+                cls._seen = {line.strip() for line in f if line.strip()}
+            cls._seen_size = size
+        return set(cls._seen)
+
+    @classmethod
+    def append(cls, items):
+        """Appends new stories to the log and their digests to the dedup index."""
+        if not items:
+            return
+        os.makedirs(cls.DATA_DIR, exist_ok=True)
+        with open(cls.LOG_FILE, 'a') as log, open(cls.SEEN_FILE, 'a') as seen:
+            for item in items:
+                log.write(json.dumps(item, ensure_ascii=False) + "\n")
+                seen.write(cls.link_hash(item["link"]) + "\n")
+        if cls._seen is not None:
+            cls._seen.update(cls.link_hash(item["link"]) for item in items)
+            cls._seen_size = os.path.getsize(cls.SEEN_FILE)
+
+    @classmethod
+    def load_top_k(cls):
+        if not os.path.exists(cls.TOP_K_FILE): return []
+        try:
+            with open(cls.TOP_K_FILE, 'r') as f: return json.load(f)
+        except Exception as e:
+            logger.error(f"❌ Top-K view unreadable, rebuilding from new items only: {e}")
+            return []
+
+    @classmethod
+    def update_top_k(cls, new_items):
+        """
+        Merges new stories into the bounded relevance view with a size-K min-heap.
+        Ties keep the earlier-ingested item, matching the old stable sort.
+        """
+        view = cls.load_top_k()
+        if not new_items and len(view) <= cls.TOP_K:
+            return view
+
+        heap = []
+        for seq, item in enumerate(view + list(new_items)):
+            # Negative seq: on equal score the older item ranks higher
+            key = (item.get('relevance_score', 0), -seq)
+            if len(heap) < cls.TOP_K:
+                heapq.heappush(heap, (key, item))
+            elif key > heap[0][0]:
+                heapq.heapreplace(heap, (key, item))
+
+        view = [item for _, item in sorted(heap, key=lambda x: x[0], reverse=True)]
+        os.makedirs(cls.DATA_DIR, exist_ok=True)
+        with open(cls.TOP_K_FILE, 'w') as f:
+            json.dump(view, f, indent=2)
+        return view
+
+    @classmethod
+    def iter_history(cls, min_score=None, source=None):
+        """Streams the full log line by line without loading it into memory."""
+        if not os.path.exists(cls.LOG_FILE):
+            return
+        with open(cls.LOG_FILE, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if min_score is not None and item.get('relevance_score', 0) < min_score:
+                    continue
+                if source is not None and item.get('source') != source:
+                    continue
+                yield item
+
+    @classmethod
+    def _migrate_legacy(cls):
+        """One-time seed: older runs only kept the top-80 news_list.json."""
+        if os.path.exists(cls.SEEN_FILE) or os.path.exists(cls.LOG_FILE):
+            return
+        legacy = cls.load_top_k()
+        if legacy:
+            logger.info(f"📦 Seeding news log from {len(legacy)} legacy news_list.json items.")
+            cls.append(legacy)
@@ -1,26 +1,68 @@
-import requests
 import os
-import logging
 import html
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from scripts.utils import Metrics, get_logger
 
-logger = logging.getLogger("Telegram_Notifier")
+logger = get_logger("Telegram_Notifier")
 
 class TelegramNotifier:
+    API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+
+    # Telegram limits: ~1 msg/sec per chat, ~30 msg/sec per bot overall
+    PER_CHAT_INTERVAL = 1.0
+    GLOBAL_RATE = 30
+    MAX_RETRIES = 3
+    MAX_WORKERS = 32
+    TIMEOUT = 15  # 15s timeout for GitHub Actions stability
+
+    _session = None
+    _session_lock = threading.Lock()
+    _rate_lock = threading.Lock()
+    _next_global_slot = 0.0
+    _next_chat_slot = {}  # {chat_id: monotonic time of its next free slot}, shared by every sender
+
     @classmethod
-    def send_alpha(cls, text):
-        # Retrieve tokens from Environment (Local .env or GitHub Secrets)
-        token = os.getenv("TELEGRAM_TOKEN")
-        chat_id = os.getenv("TELEGRAM_CHAT_ID")
-        
-        if not token or not chat_id:
-            logger.error("🚫 TELEGRAM_TOKEN or CHAT_ID missing from Environment.")
-            return False
+    def _get_session(cls):
+        """One pooled keep-alive session per process, shared across chats."""
+        with cls._session_lock:
+            if cls._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=cls.MAX_WORKERS)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                cls._session = session
+            return cls._session
+
+    @classmethod
+    def _acquire_global_slot(cls):
+        """Spaces sends across all chats to stay under the bot-wide rate."""
+        with cls._rate_lock:
+            now = time.monotonic()
+            slot = max(now, cls._next_global_slot)
+            cls._next_global_slot = slot + 1.0 / cls.GLOBAL_RATE
+        if slot > now:
+            time.sleep(slot - now)
 
+    @classmethod
+    def _acquire_chat_slot(cls, chat_id):
+        """Spaces sends to one chat even when several portfolios deliver to it at once."""
+        with cls._rate_lock:
+            now = time.monotonic()
+            slot = max(now, cls._next_chat_slot.get(chat_id, 0.0))
+            cls._next_chat_slot[chat_id] = slot + cls.PER_CHAT_INTERVAL
+        if slot > now:
+            time.sleep(slot - now)
+
+    @classmethod
+    def _chunk(cls, text):
         # 1. ESCAPE THE RAW AI CONTENT
         # Converts '<' to '&lt;' so they don't interfere with our HTML tags
         safe_body = html.escape(text)
-        
+
         # 2. CHUNKING LOGIC (Telegram limit is 4096 chars)
         # We use 3500 to leave a margin for our <b> and <pre> tags
         MAX_LEN = 3500
@@ -33,32 +75,99 @@ class TelegramNotifier:
                 current_chunk = line + "\n"
             else:
                 current_chunk += line + "\n"
-        
+
         if current_chunk:
             chunks.append(current_chunk.strip())
+        return chunks
 
-        # 3. SEQUENTIAL DELIVERY
-        success = True
-        for i, chunk in enumerate(chunks):
+    @classmethod
+    def _parse_chat_ids(cls, raw):
+        return [c.strip() for c in (raw or "").split(",") if c.strip()]
+
+    @classmethod
+    def send_alpha(cls, text, chat_ids=None):
+        """
+        Delivers the report to every chat concurrently.
+        chat_ids: list of IDs; defaults to TELEGRAM_CHAT_ID (comma-separated for several).
+        Chunks stay in order within a chat; chats don't wait on each other.
+        """
+        # Retrieve tokens from Environment (Local .env or GitHub Secrets)
+        token = os.getenv("TELEGRAM_TOKEN")
+        if chat_ids is None:
+            chat_ids = cls._parse_chat_ids(os.getenv("TELEGRAM_CHAT_ID"))
+
+        if not token or not chat_ids:
+            logger.error("🚫 TELEGRAM_TOKEN or CHAT_ID missing from Environment.")
+            return False
+
+        chunks = cls._chunk(text)
+        generated_at = time.strftime('%H:%M:%S IST')
+        messages = [
             # Using your verified HTML structure
-            formatted_msg = (
+            (
                 f"<b>📊 STRATEGIC ALPHA REPORT [{i+1}/{len(chunks)}]</b>\n\n"
                 f"<pre>{chunk}</pre>\n\n"
-                f"<code>Generated at: {time.strftime('%H:%M:%S IST')}</code>"
+                f"<code>Generated at: {generated_at}</code>"
             )
-            
-            if not cls._execute_send(token, chat_id, formatted_msg):
+            for i, chunk in enumerate(chunks)
+        ]
+
+        # 3. CONCURRENT FAN-OUT (sequential per chat)
+        with ThreadPoolExecutor(max_workers=min(cls.MAX_WORKERS, len(chat_ids))) as pool:
+            results = list(pool.map(lambda cid: cls._deliver_to_chat(token, cid, messages), chat_ids))
+
+        delivered = sum(results)
+        logger.info(f"📬 Report delivered to {delivered}/{len(chat_ids)} chats.")
+        return delivered == len(chat_ids)
+
+    @classmethod
+    def _deliver_to_chat(cls, token, chat_id, messages):
+        success = True
+        for message_text in messages:
+            cls._acquire_chat_slot(chat_id)
+            if not cls._execute_send(token, chat_id, message_text):
                 success = False
-            
-            # Delay to prevent Telegram Flood Error
-            time.sleep(1.5) 
-            
         return success
 
+    @classmethod
+    def _post(cls, url, payload):
+        """
+        POST with bounded retries. Honors Telegram's 429 retry_after instead of
+        a fixed sleep; network errors and 5xx back off exponentially.
+        Returns the final response, or raises the last network error.
+        """
+        from requests import RequestException
+        session = cls._get_session()
+        for attempt in range(cls.MAX_RETRIES):
+            cls._acquire_global_slot()
+            try:
+                response = session.post(url, data=payload, timeout=cls.TIMEOUT)
+            except RequestException as e:
+                if attempt == cls.MAX_RETRIES - 1:
+                    raise
+                logger.warning(f"⚠️ Telegram network error (attempt {attempt + 1}): {e}")
+                time.sleep(2 ** attempt)
+                continue
+
+            if response.status_code == 429 and attempt < cls.MAX_RETRIES - 1:
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    retry_after = 1
+                logger.warning("⏳ Telegram flood control: retrying in %ss.", retry_after)
+                Metrics.incr("telegram.429s")
+                time.sleep(retry_after)
+                continue
+            if response.status_code >= 500 and attempt < cls.MAX_RETRIES - 1:
+                time.sleep(2 ** attempt)
+                continue
+            return response
+        return response
+
     @classmethod
     def _execute_send(cls, token, chat_id, message_text):
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        
+        url = f"{cls.API_BASE}/bot{token}/sendMessage"
+
         # Using 'data' payload as verified in your test script
         payload = {
             "chat_id": chat_id,
@@ -66,20 +175,42 @@ class TelegramNotifier:
             "parse_mode": "HTML",
             "disable_web_page_preview": "True"
         }
-        
+
         try:
-            # 15s timeout for GitHub Actions stability
-            response = requests.post(url, data=payload, timeout=15)
-            response.raise_for_status()
-            logger.info("📡 Chunk delivered successfully.")
-            return True
+            with Metrics.span("telegram.send"):
+                response = cls._post(url, payload)
         except Exception as e:
+            # Network failure after retries; the post may even have landed, so no resend
             logger.error(f"❌ Telegram Delivery Error: {e}")
-            # Final emergency fallback: Send as plain text if HTML tags are broken
-            try:
-                payload.pop("parse_mode")
-                payload["text"] = f"⚠️ [FORMAT ERROR - RAW TEXT]:\n{message_text}"
-                requests.post(url, data=payload)
-            except:
-                pass
-            return False
\ No newline at end of file
+            return False
+        if response.ok:
+            logger.info("📡 Chunk delivered successfully to %s.", chat_id)
+            return True
+        if response.status_code != 400:
+            # Exhausted 429/5xx retries: a plain-text resend would only add load
+            logger.error(f"❌ Telegram Delivery Error: HTTP {response.status_code} for {chat_id}.")
+            return False
+
+        try:
+            description = response.json().get("description", "")
+        except ValueError:
+            description = response.text[:200]
+        if "can't parse entities" not in description:
+            # Chat not found, message too long, bot blocked...: plain text would fail the same way
+            logger.error(f"❌ Telegram Delivery Error: HTTP 400 for {chat_id}: {description}")
+            return False
+
+        # Telegram could not parse the HTML: resend once as plain text
+        logger.error(f"❌ Telegram rejected the HTML for {chat_id}: {description}")
+        Metrics.incr("telegram.format_fallbacks")
+        payload.pop("parse_mode")
+        payload["text"] = f"⚠️ [FORMAT ERROR - RAW TEXT]:\n{message_text}"
+        try:
+            fallback = cls._post(url, payload)
+        except Exception as fallback_error:
+            logger.error(f"❌ Plain-text fallback failed: {fallback_error}")
+            return False
+        if not fallback.ok:
+            logger.error(f"❌ Plain-text fallback failed: HTTP {fallback.status_code}")
+        # Delivered as raw text still counts: resending would repeat the same bad HTML
+        return fallback.ok
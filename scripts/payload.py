@@ -0,0 +1,193 @@
+# scripts/payload.py
+import json
+import os
+from scripts.scoring import ScoringEngine
+from scripts.structure import StructureEngine
+from scripts.utils import Metrics, get_logger
+
+logger = get_logger("PortfolioManager_Payload")
+
+
+class PayloadBuilder:
+    """
+    Compact, token-budgeted user payload for the Decision Layer.
+    Tickers and news go out as pipe-separated tables with only the fields the
+    model reads (no links, fetch timestamps or pretty-print whitespace): one
+    row per allocated ticker, scores and indicators side by side, and one
+    summary line per action for tickers that get nothing.
+    """
+    TOKEN_BUDGET = int(os.getenv("BRAIN_TOKEN_BUDGET", "3000"))
+    CHARS_PER_TOKEN = 4        # Rough LLaMA tokenizer average for English + numbers
+    NEWS_PER_TICKER = 3
+    SECTOR_NEWS = 5            # Untagged policy/sector headlines
+    TITLE_MAX_CHARS = 120
+
+    STRUCTURE_CODES = {
+        "BULLISH (HH/HL)": "HH/HL",
+        "BEARISH (LH/LL)": "LH/LL",
+        "RANGE_BOUND / FLATTENING": "RANGE",
+    }
+
+    @classmethod
+    def estimate_tokens(cls, text):
+        return cls._tokens_for_chars(len(text))
+
+    @classmethod
+    def _tokens_for_chars(cls, chars):
+        return (chars + cls.CHARS_PER_TOKEN - 1) // cls.CHARS_PER_TOKEN
+
+    @classmethod
+    def _timeframe_cell(cls, m):
+        """Shorter-timeframe structure, e.g. "1W:LH/LL,1M:HH/HL"; the primary is its own column."""
+        timeframes = m.get("timeframes") or {}
+        return ",".join(
+            f"{tf}:{cls.STRUCTURE_CODES.get(v.get('structure', ''), v.get('structure', ''))}"
+            for tf, v in timeframes.items() if tf != StructureEngine.PRIMARY
+        ) or "-"
+
+    @classmethod
+    def _table(cls, prices, scores, keep=()):
+        """
+        Merged score + indicator table. Unallocated tickers collapse into one
+        "action: symbols" line per action unless they are in keep (event tickers).
+        """
+        metrics = prices.get("metrics", {}) if isinstance(prices, dict) else {}
+        lines = ["symbol|score|T|N|F|alloc|action|above_ema50|structure|since|tf|margin%|debt_eq"]
+        idle = {}
+        for r in scores["rows"]:
+            symbol, m = r["symbol"], metrics.get(r["symbol"])
+            if r["allocation"] == 0 and symbol not in keep:
+                idle.setdefault(r["action"], []).append(symbol)
+                continue
+            if r["score"] is None or not isinstance(m, dict):
+                lines.append(f"{symbol}|NA|NA|NA|NA|₹0|{r['action']}|NA|NA|NA|NA|NA|NA")
+                continue
+            structure = m.get("market_structure", "")
+            lines.append("|".join([
+                symbol,
+                f"{r['score']:.2f}",
+                f"{r['trend']:g}",
+                f"{r['news']:g}",
+                f"{r['fundamentals']:g}",
+                f"₹{r['allocation']:,}",
+                r["action"],
+                "Y" if m.get("is_structural_bull") else "N",
+                cls.STRUCTURE_CODES.get(structure, structure),
+                m.get("structure_since") or "-",
+                cls._timeframe_cell(m),
+                f"{(m.get('margins') or 0) * 100:.1f}",
+                f"{m.get('debt_ratio') or 0:.1f}",
+            ]))
+        for action, symbols in idle.items():
+            lines.append(f"{action} (₹0, {len(symbols)}): {','.join(symbols)}")
+        lines.append(f"TOTAL DEPLOYMENT: ₹{scores['total_allocation']:,} of ₹{scores['budget']:,}")
+        return lines
+
+    @classmethod
+    def select_news(cls, news, bases):
+        """Top-N per ticker plus the strongest untagged sector headlines, best first."""
+        ranked = sorted(news or [], key=lambda x: x.get("relevance_score", 0), reverse=True)
+        per_ticker = {}
+        sector = []
+        selected = []
+        seen_titles = set()
+        watched = set(bases)
+        for item in ranked:
+            # Syndicated copies of one story arrive under different links
+            title_key = " ".join(item.get("title", "").upper().split())
+            if title_key in seen_titles:
+                continue
+            seen_titles.add(title_key)
+            tagged = ScoringEngine.item_tickers(item, bases)
+            tickers = [t for t in tagged if t in watched]
+            if tagged and not tickers:
+                continue  # Another portfolio's story
+            if not tickers:
+                if len(sector) < cls.SECTOR_NEWS:
+                    sector.append(item)
+                    selected.append(item)
+                continue
+            # Keep the item if any of its tickers still has room
+            if any(per_ticker.get(t, 0) < cls.NEWS_PER_TICKER for t in tickers):
+                for t in tickers:
+                    per_ticker[t] = per_ticker.get(t, 0) + 1
+                selected.append(item)
+        return selected
+
+    @classmethod
+    def _news_line(cls, item, bases):
+        title = " ".join(item.get("title", "").split())
+        if len(title) > cls.TITLE_MAX_CHARS:
+            title = title[:cls.TITLE_MAX_CHARS - 1] + "…"
+        return "|".join([
+            ",".join(ScoringEngine.item_tickers(item, bases)) or "-",
+            item.get("category", ""),
+            str(item.get("relevance_score", 0)),
+            title.replace("|", "/"),
+        ])
+
+    @classmethod
+    def _event_line(cls, event):
+        before = cls.STRUCTURE_CODES.get(event.get("before"), event.get("before"))
+        after = cls.STRUCTURE_CODES.get(event.get("after"), event.get("after"))
+        change = f"{before}->{after}" if before is not None else str(after)
+        return f"{event.get('symbol') or '-'}|{event['type']}|{change.replace('|', '/')}"
+
+    @classmethod
+    def _render(cls, table_lines, news_lines, event_lines=None):
+        news = "NEWS (tickers|category|score|title):\n" + ("\n".join(news_lines) or "none") + "\n\n"
+        if event_lines:
+            return (
+                "CHANGES since the last report (symbol|event|change):\n" + "\n".join(event_lines) + "\n\n"
+                "TABLE (final, affected tickers):\n" + "\n".join(table_lines) + "\n\n" + news +
+                "Explain what changed and the SIP Alpha action for each affected ticker."
+            )
+        return (
+            "TABLE (final):\n" + "\n".join(table_lines) + "\n\n" + news +
+            "Explain today's SIP Alpha actions for each ticker."
+        )
+
+    @classmethod
+    def build(cls, prices, news, scores, token_budget=None, events=None, focus=None):
+        """
+        Returns the compact user content. News rows are dropped lowest-relevance
+        first until the estimate fits the token budget; the table is never cut,
+        so a table over budget on its own is logged and counted instead.
+        events/focus: incremental update, a CHANGES section plus tables and
+        news for the focus tickers only (scores still cover the whole portfolio).
+        """
+        with Metrics.span("brain.payload"):
+            return cls._build(prices, news, scores, token_budget or cls.TOKEN_BUDGET, events, focus)
+
+    @classmethod
+    def _build(cls, prices, news, scores, token_budget, events=None, focus=None):
+        if focus is not None:
+            focus = set(focus)
+            scores = {**scores, "rows": [r for r in scores["rows"] if r["symbol"] in focus]}
+            prices = {**prices, "metrics": {s: m for s, m in prices.get("metrics", {}).items() if s in focus}}
+        table_lines = cls._table(prices, scores, keep={e.get("symbol") for e in events or []})
+        metrics = prices.get("metrics", {}) if isinstance(prices, dict) else {}
+        bases = [ScoringEngine.base_symbol(s) for s in metrics]
+        news_lines = [cls._news_line(item, bases) for item in cls.select_news(news, bases)]
+        event_lines = [cls._event_line(e) for e in events or []]
+
+        fixed_tokens = cls.estimate_tokens(cls._render(table_lines, [], event_lines))
+        if fixed_tokens > token_budget:
+            logger.warning(f"⚠️ Ticker table alone is ~{fixed_tokens} tok, over the {token_budget} tok budget.")
+            Metrics.incr("brain.payload_over_budget")
+
+        content = cls._render(table_lines, news_lines, event_lines)
+        while news_lines and cls.estimate_tokens(content) > token_budget:
+            news_lines.pop()
+            content = cls._render(table_lines, news_lines, event_lines)
+
+        # Size instrumentation: what the legacy pretty-printed payload would have cost
+        legacy_chars = len(json.dumps(prices, indent=2)) + len(json.dumps(news, indent=2))
+        logger.info(
+            f"📦 Payload: {legacy_chars} chars (~{cls._tokens_for_chars(legacy_chars)} tok) legacy -> "
+            f"{len(content)} chars (~{cls.estimate_tokens(content)} tok) compact, "
+            f"{len(news_lines)} news rows, budget {token_budget} tok."
+        )
+        Metrics.incr("brain.payload_chars_legacy", legacy_chars)
+        Metrics.incr("brain.payload_chars", len(content))
+        return content
@@ -0,0 +1,154 @@
+# scripts/portfolios.py
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from scripts.utils import Metrics, get_logger
+
+logger = get_logger("PortfolioManager_Portfolios")
+
+
+class PortfolioService:
+    """
+    Multi-client SIP runs over shared market data.
+    1. Portfolios (name, budget, tickers, chat_ids) come from CONFIG_FILE
+    2. Prices and news are fetched once for the union of every watchlist
+    3. Each portfolio gets its own scoped audit, run concurrently; the Groq
+       rate limiter in BrainService keeps the burst inside the quota
+    Without a config file there is one "default" portfolio built from the
+    legacy StockService.TICKERS / BrainService.TOTAL_BUDGET settings.
+    """
+    CONFIG_FILE = os.getenv(
+        "PORTFOLIOS_FILE", os.path.join(os.path.dirname(__file__), "..", "config", "portfolios.json")
+    )
+    MAX_WORKERS = int(os.getenv("PORTFOLIO_WORKERS", "8"))
+
+    @classmethod
+    def _resolve_chat_ids(cls, chat_ids):
+        """Entries like "$CLIENT_A_CHAT" are read from the environment so IDs stay out of git."""
+        if chat_ids is None:
+            return None
+        if isinstance(chat_ids, str):
+            chat_ids = [chat_ids]
+        resolved = []
+        for chat_id in chat_ids:
+            value = os.getenv(chat_id[1:], "") if str(chat_id).startswith("$") else str(chat_id)
+            resolved.extend(c.strip() for c in value.split(",") if c.strip())
+        return resolved
+
+    @classmethod
+    def load(cls):
+        """Returns [{"name", "budget", "tickers", "chat_ids"}]. chat_ids None = notifier default."""
+        if not os.path.exists(cls.CONFIG_FILE):
+            from scripts.brain import BrainService
+            from scripts.stock_api import StockService
+            return [{"name": "default", "budget": BrainService.TOTAL_BUDGET,
+                     "tickers": list(StockService.TICKERS), "chat_ids": None}]
+
+        with open(cls.CONFIG_FILE, 'r') as f:
+            raw = json.load(f)
+        portfolios = []
+        for entry in raw.get("portfolios", []):
+            if not entry.get("tickers") or not entry.get("budget"):
+                logger.warning(f"⚠️ Portfolio '{entry.get('name')}' has no tickers or budget, skipping.")
+                continue
+            portfolios.append({
+                "name": entry.get("name") or f"portfolio_{len(portfolios) + 1}",
+                "budget": entry["budget"],
+                "tickers": list(dict.fromkeys(entry["tickers"])),
+                "chat_ids": cls._resolve_chat_ids(entry.get("chat_ids")),
+            })
+        logger.info(f"📒 Loaded {len(portfolios)} portfolios from {cls.CONFIG_FILE}.")
+        return portfolios
+
+    @staticmethod
+    def union_tickers(portfolios):
+        """Every watched symbol once, in first-seen order."""
+        return list(dict.fromkeys(t for p in portfolios for t in p["tickers"]))
+
+    @staticmethod
+    def scope_prices(prices, tickers):
+        """The shared snapshot restricted to one portfolio's watchlist."""
+        metrics = prices.get("metrics", {}) if isinstance(prices, dict) else {}
+        return {**(prices or {}), "metrics": {t: metrics.get(t, "N/A") for t in tickers}}
+
+    @classmethod
+    def run_audits(cls, portfolios, prices=None, news=None, plan=None):
+        """
+        Scoped audit per portfolio, concurrently. Returns {name: decision or None}.
+        Snapshots are read from disk once and shared by every portfolio.
+        plan: ChangeDetector.plan() result. Portfolios with a digest due get a
+        full audit, those with events an incremental one, and the rest are
+        left out of the result; None audits everything.
+        """
+        from scripts.brain import BrainService
+        from scripts.change_detector import ChangeDetector
+
+        if prices is None:
+            prices = BrainService._read_prices()
+        if news is None:
+            news = BrainService._read_json(BrainService.NEWS_FILE)
+
+        events = {}
+        if plan is not None:
+            # A portfolio missing from the plan (e.g. added mid-run) gets the full audit
+            per_portfolio = {p["name"]: plan["portfolios"].get(p["name"], {"events": [], "digest": True})
+                             for p in portfolios}
+            events = {name: p["events"] for name, p in per_portfolio.items() if not p["digest"]}
+            skipped = [p for p in portfolios if p["name"] in events and not events[p["name"]]]
+            if skipped:
+                logger.info(f"😴 {len(skipped)}/{len(portfolios)} portfolios unchanged, no audit needed.")
+                Metrics.incr("portfolio.audits_skipped", len(skipped))
+            portfolios = [p for p in portfolios if p not in skipped]
+            if not portfolios:
+                return {}
+
+        def audit(portfolio):
+            scoped = events.get(portfolio["name"])
+            with Metrics.span("portfolio.audit", key=portfolio["name"]):
+                return BrainService.run_audit(
+                    prices=cls.scope_prices(prices, portfolio["tickers"]), news=news, budget=portfolio["budget"],
+                    events=scoped, focus=ChangeDetector.focus(scoped) if scoped else None
+                )
+
+        if len(portfolios) == 1:
+            return {portfolios[0]["name"]: audit(portfolios[0])}
+
+        decisions = {}
+        with ThreadPoolExecutor(max_workers=min(cls.MAX_WORKERS, len(portfolios))) as pool:
+            futures = {p["name"]: pool.submit(audit, p) for p in portfolios}
+            for name, future in futures.items():
+                try:
+                    decisions[name] = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Audit for portfolio '{name}' failed: {e}")
+                    decisions[name] = None
+        logger.info(f"🧠 {sum(1 for d in decisions.values() if d)}/{len(portfolios)} portfolio decisions ready.")
+        return decisions
+
+    @classmethod
+    def notify(cls, portfolios, decisions):
+        """True only if every portfolio in decisions was delivered."""
+        return all(cls.deliver(portfolios, decisions).values())
+
+    @classmethod
+    def deliver(cls, portfolios, decisions):
+        """
+        Sends each decision to its portfolio's chats. Portfolios missing from
+        decisions (nothing changed) are not messaged. Returns {name: delivered}.
+        """
+        from scripts.notifier import TelegramNotifier
+
+        def send(portfolio):
+            text = decisions.get(portfolio["name"])
+            if not text:
+                logger.error(f"🚫 No decision for portfolio '{portfolio['name']}', skipping notification.")
+                return False
+            if len(portfolios) > 1:
+                text = f"📁 {portfolio['name']} (₹{portfolio['budget']:,}/month)\n\n{text}"
+            return TelegramNotifier.send_alpha(text, chat_ids=portfolio["chat_ids"])
+
+        # Per-chat pacing and the bot-wide limit live in the notifier, so portfolios can overlap
+        with ThreadPoolExecutor(max_workers=max(1, min(cls.MAX_WORKERS, len(portfolios)))) as pool:
+            targets = [p for p in portfolios if p["name"] in decisions]
+            results = list(pool.map(send, targets))
+        return {p["name"]: ok for p, ok in zip(targets, results)}
@@ -0,0 +1,166 @@
+# scripts/scoring.py
+import re
+import numpy as np
+from scripts.utils import get_logger
+
+logger = get_logger("PortfolioManager_Scoring")
+
+
+class ScoringEngine:
+    """
+    Deterministic SIP Alpha scoring (30/20/50 TREND/NEWS/FUNDAMENTALS),
+    action bands and rupee allocation, vectorized across the universe.
+    The LLM narrates this table instead of doing the arithmetic itself.
+    """
+    WEIGHTS = {"trend": 0.3, "news": 0.2, "fundamentals": 0.5}
+
+    BULLISH = "BULLISH (HH/HL)"
+    RANGE = "RANGE_BOUND / FLATTENING"
+
+    # (minimum score, action label, allocation units)
+    BANDS = [
+        (0.7, "🟢 SIP AGGRESSIVE", 2),
+        (0.5, "🟡 SIP NORMAL", 1),
+        (0.3, "🟠 SIP PAUSE / WATCH", 0),
+        (float("-inf"), "🔴 NO SIP", 0),
+    ]
+
+    # Sector/policy headlines with no ticker tag lift every watchlist name to at most
+    # this: critical ones in full, routine ones by relevance at ROUTINE weight, so a
+    # normal news day does not flatten the news column across the universe
+    SECTOR_NEWS_SCORE = 0.5
+    SECTOR_ROUTINE_WEIGHT = 0.5
+
+    @staticmethod
+    def base_symbol(symbol):
+        """'BHEL.NS' -> 'BHEL' (news is tagged with exchange-less tickers)."""
+        return symbol.split(".")[0].upper()
+
+    @classmethod
+    def trend_scores(cls, bull, structure):
+        """+1.0 bull & HH/HL, +0.5 range-bound or HH/HL below EMA50, +0.0 LH/LL."""
+        is_bullish = structure == cls.BULLISH
+        is_range = structure == cls.RANGE
+        return np.select([bull & is_bullish, is_range | is_bullish], [1.0, 0.5], default=0.0)
+
+    @staticmethod
+    def fundamental_scores(margins):
+        """+1.0 margins > 8%, +0.7 5-8%, +0.4 positive but thin, +0.0 negative/none."""
+        return np.select([margins > 0.08, margins >= 0.05, margins > 0], [1.0, 0.7, 0.4], default=0.0)
+
+    @staticmethod
+    def item_tickers(item, bases):
+        """Ticker tags for a news item; legacy items pre-date tagging and get a word-boundary scan."""
+        tickers = item.get("tickers")
+        if tickers is None:
+            title = item.get("title", "").upper()
+            tickers = [b for b in bases if re.search(rf"(?<![A-Z0-9]){re.escape(b)}(?![A-Z0-9])", title)]
+        return tickers
+
+    @classmethod
+    def news_scores(cls, bases, news):
+        """
+        +1.0 ORDER_WIN (execution) for the ticker, +0.5 ticker headline or critical
+        sector headline, less for a routine sector headline, +0.0 none.
+        """
+        scores = np.zeros(len(bases))
+        index = {b: i for i, b in enumerate(bases)}
+        sector_tailwind = 0.0
+        for item in news or []:
+            tickers = cls.item_tickers(item, bases)
+            if not tickers:
+                sector_tailwind = max(sector_tailwind, cls.sector_score(item))
+                continue
+            value = 1.0 if item.get("category") == "ORDER_WIN" else 0.5
+            for t in tickers:
+                i = index.get(t.upper())
+                if i is not None:
+                    scores[i] = max(scores[i], value)
+        if sector_tailwind:
+            scores = np.maximum(scores, sector_tailwind)
+        return scores
+
+    @classmethod
+    def sector_score(cls, item):
+        """News score an untagged headline lends every ticker: 0.5 critical, <= 0.25 routine."""
+        if item.get("is_critical"):
+            return cls.SECTOR_NEWS_SCORE
+        relevance = min(max(float(item.get("relevance_score") or 0), 0.0), 10.0)
+        return round(cls.SECTOR_NEWS_SCORE * cls.SECTOR_ROUTINE_WEIGHT * relevance / 10.0, 4)
+
+    @staticmethod
+    def _allocate(units, budget):
+        """(units / total units) x budget in whole rupees; largest remainders absorb rounding."""
+        total_units = units.sum()
+        if total_units <= 0:
+            return np.zeros(len(units), dtype=int)
+        raw = units / total_units * budget
+        allocation = np.floor(raw).astype(int)
+        shortfall = int(round(budget - allocation.sum()))
+        if shortfall > 0:
+            allocation[np.argsort(-(raw - allocation), kind="stable")[:shortfall]] += 1
+        return allocation
+
+    @classmethod
+    def score_universe(cls, metrics, news, budget):
+        """
+        metrics: {symbol: metrics dict or "N/A"} (price_list.json snapshot)
+        news: list of news items (news_list.json)
+        Returns {"rows": [...], "total_allocation": int, "budget": budget}.
+        """
+        symbols = [s for s, m in metrics.items() if isinstance(m, dict)]
+        skipped = [s for s, m in metrics.items() if not isinstance(m, dict)]
+
+        bull = np.array([bool(metrics[s].get("is_structural_bull")) for s in symbols], dtype=bool)
+        structure = np.array([metrics[s].get("market_structure", "") for s in symbols], dtype=object)
+        margins = np.array([float(metrics[s].get("margins") or 0.0) for s in symbols])
+        bases = [cls.base_symbol(s) for s in symbols]
+
+        trend = cls.trend_scores(bull, structure)
+        news_score = cls.news_scores(bases, news)
+        fundamentals = cls.fundamental_scores(margins)
+        score = np.round(
+            cls.WEIGHTS["trend"] * trend
+            + cls.WEIGHTS["news"] * news_score
+            + cls.WEIGHTS["fundamentals"] * fundamentals, 4
+        )
+
+        thresholds = np.array([b[0] for b in cls.BANDS])
+        # Bands are sorted high->low: first threshold the score clears
+        band_idx = np.argmax(score[:, None] >= thresholds[None, :], axis=1) if len(symbols) else np.array([], dtype=int)
+        units = np.array([cls.BANDS[i][2] for i in band_idx], dtype=float)
+        allocation = cls._allocate(units, budget)
+
+        rows = []
+        for i, s in enumerate(symbols):
+            rows.append({
+                "symbol": s,
+                "trend": float(trend[i]),
+                "news": float(news_score[i]),
+                "fundamentals": float(fundamentals[i]),
+                "score": float(score[i]),
+                "action": cls.BANDS[band_idx[i]][1],
+                "allocation": int(allocation[i]),
+            })
+        for s in skipped:
+            rows.append({"symbol": s, "trend": None, "news": None, "fundamentals": None,
+                         "score": None, "action": "⚪ NO DATA", "allocation": 0})
+
+        total = int(sum(r["allocation"] for r in rows))
+        logger.info(f"🧮 Scored {len(symbols)} tickers locally. Deploying ₹{total} of ₹{budget}.")
+        return {"rows": rows, "total_allocation": total, "budget": budget}
+
+    @staticmethod
+    def render_table(result):
+        """Plain-text audit table (goes inside <pre> tags)."""
+        lines = [f"{'TICKER':<14} {'T':>4} {'N':>4} {'F':>4} {'SCORE':>6}  {'ALLOC':>7}  ACTION"]
+        for r in result["rows"]:
+            if r["score"] is None:
+                lines.append(f"{r['symbol']:<14} {'-':>4} {'-':>4} {'-':>4} {'-':>6}  {'₹0':>7}  {r['action']}")
+                continue
+            lines.append(
+                f"{r['symbol']:<14} {r['trend']:>4.1f} {r['news']:>4.1f} {r['fundamentals']:>4.1f} "
+                f"{r['score']:>6.2f}  {'₹' + format(r['allocation'], ','):>7}  {r['action']}"
+            )
+        lines.append(f"TOTAL DEPLOYMENT: ₹{result['total_allocation']:,} of ₹{result['budget']:,}")
+        return "\n".join(lines)
@@ -1,16 +1,19 @@
 # scripts/stock_api.py
-import yfinance as yf
 import json
 import os
-import logging
-import pandas as pd
 from datetime import datetime
+from scripts.metrics_store import MetricsStore
+from scripts.utils import Metrics, get_logger
 
 # Custom Instruction: Always add lots of logs
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("SIP_Stock_API")
+logger = get_logger("SIP_Stock_API")
 
 class StockService:
+    """
+    yfinance/pandas and the modules built on them are imported inside the
+    methods that use them, so importing StockService (e.g. for DATA_FILE)
+    stays cheap for entry points that never fetch prices.
+    """
     TICKERS = ["BHEL.NS", "MTARTECH.NS", "WALCHANNAG.NS", "LT.NS", "NTPC.NS"]
     DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "price_list.json")
 
@@ -22,86 +25,122 @@ class StockService:
         2. 6-Month Structure (HH/HL vs LH/LL)
         3. Fundamentals (Margins/Debt)
         """
+        import yfinance as yf
         try:
             logger.info(f"📡 Fetching 1Y history for {ticker_symbol} to audit structure...")
             ticker = yf.Ticker(ticker_symbol)
             # Fetch 1y to get clean 6mo structure + EMA50 lead-in
             df = ticker.history(period="1y")
-            
             if df.empty or len(df) < 130: # 130 days ~ 6 months
                 logger.warning(f"⚠️ Insufficient history for {ticker_symbol}")
                 return None
+            return cls._compute_metrics(ticker_symbol, df, ticker.info)
+        except Exception as e:
+            logger.error(f"❌ Structural Audit Error on {ticker_symbol}: {e}")
+            return None
 
-            # 1. PRICE & EMAs
-            current_price = df['Close'].iloc[-1]
-            ema_50 = df['Close'].ewm(span=50, adjust=False).mean().iloc[-1]
-            
-            # [TECHNICAL DEBT FLAG]: EMA20 is kept for legacy but ignored by Brain
-            ema_20 = df['Close'].ewm(span=20, adjust=False).mean().iloc[-1]
-
-            # 2. 6-MONTH STRUCTURE ANALYSIS
-            # Compare the last 3 months to the 3 months before that
-            recent_3m = df.iloc[-63:] # Approx 3 months
-            prior_3m = df.iloc[-126:-63] # Prior 3 months
-            
-            recent_high = recent_3m['High'].max()
-            recent_low = recent_3m['Low'].min()
-            prior_high = prior_3m['High'].max()
-            prior_low = prior_3m['Low'].min()
-
-            # Logic: Higher Highs (HH) + Higher Lows (HL) = Bullish Structure
-            if recent_high > prior_high and recent_low > prior_low:
-                structure = "BULLISH (HH/HL)"
-            # Logic: Lower Highs (LH) + Lower Lows (LL) = Bearish Structure
-            elif recent_high < prior_high and recent_low < prior_low:
-                structure = "BEARISH (LH/LL)"
-            else:
-                structure = "RANGE_BOUND / FLATTENING"
+    @classmethod
+    def _compute_metrics(cls, ticker_symbol, df, info):
+        """Single-ticker wrapper around the vectorized batch path."""
+        return cls.build_metrics({ticker_symbol: df}, {ticker_symbol: info}).get(ticker_symbol)
+
+    @classmethod
+    def build_metrics(cls, histories, infos):
+        """
+        Builds {symbol: metrics dict} for every ticker in one vectorized indicator pass.
+        Tickers with too little history map to None.
+        """
+        from scripts.indicators import IndicatorEngine
+        from scripts.structure import StructureEngine
+        try:
+            with Metrics.span("indicators.compute"):
+                symbols, dates, close, high, low = IndicatorEngine.stack(histories)
+                ind = IndicatorEngine.compute(close, high, low, dates)
+        except Exception as e:
+            logger.error(f"❌ Structural Audit Error on batch of {len(histories)}: {e}")
+            return {}
+
+        results = {}
+        for i, ticker_symbol in enumerate(symbols):
+            if not ind["valid"][i]:
+                logger.warning("⚠️ Insufficient history for %s", ticker_symbol)
+                results[ticker_symbol] = None
+                continue
 
             # 3. FUNDAMENTALS
-            info = ticker.info
+            info = infos.get(ticker_symbol) or {}
             debt_ratio = info.get('debtToEquity', 0.0)
             margins = info.get('profitMargins', 0.0)
 
-            logger.info(f"✅ {ticker_symbol}: Structure={structure} | EMA50={round(ema_50, 2)}")
+            current_price = ind["price"][i]
+            ema_50 = ind["ema_50"][i]
+            structure = ind["market_structure"][i]
+            timeframes = {
+                tf: {"structure": out["label"][i], "since": out["flip_date"][i]}
+                for tf, out in ind["structures"].items()
+            }
+            logger.info("✅ %s: Structure=%s | EMA50=%.2f", ticker_symbol, structure, ema_50)
 
-            return {
+            results[ticker_symbol] = {
                 "symbol": str(ticker_symbol),
                 "price": float(round(current_price, 2)),
                 "ema_50": float(round(ema_50, 2)),
-                "is_structural_bull": bool(current_price > ema_50),
+                "is_structural_bull": bool(ind["is_structural_bull"][i]),
                 "market_structure": structure,
+                "structure_since": timeframes[StructureEngine.PRIMARY]["since"],
+                "timeframes": timeframes,
                 "debt_ratio": float(debt_ratio) if debt_ratio else 0.0,
                 "margins": float(margins) if margins else 0.0,
                 "timestamp": datetime.now().isoformat()
             }
-        except Exception as e:
-            logger.error(f"❌ Structural Audit Error on {ticker_symbol}: {e}")
-            return None
+        return results
 
     @classmethod
-    def update_prices(cls):
-        """Updates the local JSON storage with the new SIP-grade metrics."""
+    def update_prices(cls, tickers=None):
+        """
+        Updates the local JSON storage with the new SIP-grade metrics.
+        tickers: universe to scan (e.g. the union of all portfolios); defaults to TICKERS.
+        """
+        from scripts.bar_cache import BarCache
+        from scripts.fundamentals_cache import FundamentalsCache
+        from scripts.indicators import IndicatorEngine
+
         logger.info("🚀 Initiating Monthly SIP Metric Scan...")
         
         today_str = datetime.now().strftime('%Y-%m-%d')
-        current_data = cls._load_storage()
-        
-        # We only keep the latest snapshot for the Brain to act on
+
         new_entry = {
             "date": today_str,
             "metrics": {}
         }
 
-        for t in cls.TICKERS:
-            data = cls.fetch_strategic_data(t)
+        # Incremental pull: only bars newer than the local cache hit the network
+        tickers = list(tickers or cls.TICKERS)
+        histories = BarCache.refresh(tickers)
+        eligible = []
+        for t in tickers:
+            df = histories.get(t)
+            if df is None or len(df) < IndicatorEngine.MIN_BARS:
+                logger.warning("⚠️ Insufficient history for %s", t)
+            else:
+                eligible.append(t)
+
+        # Fundamentals come from the TTL cache; only misses call ticker.info
+        infos = FundamentalsCache.get_many(eligible)
+
+        metrics = cls.build_metrics({t: histories[t] for t in eligible}, infos)
+
+        for t in tickers:
+            data = metrics.get(t)
             if data:
                 new_entry["metrics"][t] = data
             else:
                 new_entry["metrics"][t] = "N/A"
 
-        # Update or Overwrite (For SIPs, we want the most recent structural state)
-        cls._save_storage([new_entry]) 
+        # History is append-only in the MetricsStore; price_list.json stays as the latest-snapshot view
+        MetricsStore.append_snapshot(new_entry)
+        cls._save_storage([new_entry])
+        return new_entry
 
     @classmethod
     def _load_storage(cls):
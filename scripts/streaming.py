@@ -0,0 +1,269 @@
+# scripts/streaming.py
+import json
+import math
+import os
+import time
+from collections import deque
+from datetime import datetime
+from scripts.indicators import IndicatorEngine
+from scripts.utils import Metrics, get_logger
+
+logger = get_logger("SIP_Streaming")
+
+
+def _push_max(dq, idx, value):
+    while dq and dq[-1][1] <= value:
+        dq.pop()
+    dq.append((idx, value))
+
+
+def _push_min(dq, idx, value):
+    while dq and dq[-1][1] >= value:
+        dq.pop()
+    dq.append((idx, value))
+
+
+def _expire(dq, min_idx):
+    while dq and dq[0][0] < min_idx:
+        dq.popleft()
+
+
+def _front(dq):
+    return dq[0][1] if dq else math.nan
+
+
+def _fmax(a, b):
+    return b if math.isnan(a) else a if math.isnan(b) else max(a, b)
+
+
+def _fmin(a, b):
+    return b if math.isnan(a) else a if math.isnan(b) else min(a, b)
+
+
+class TickerState:
+    """
+    Incremental indicator state for one ticker, same maths as IndicatorEngine.
+    The series is `n` committed daily bars plus one live bar (today so far).
+    EMAs are kept through the last committed bar; window extrema live in
+    monotonic deques, so a new bar or quote costs O(1) amortized.
+    """
+    __slots__ = ("window", "n", "ema_50", "ema_20", "live", "recent", "rh", "rl", "ph", "pl")
+
+    def __init__(self, window):
+        self.window = window
+        self.n = 0                     # Committed bar count (next bar index)
+        self.ema_50 = math.nan
+        self.ema_20 = math.nan
+        self.live = None               # [day, high, low, close]
+        self.recent = deque()          # (idx, high, low) of the last window-1 committed bars
+        self.rh, self.rl = deque(), deque()  # Recent window max(high) / min(low)
+        self.ph, self.pl = deque(), deque()  # Prior window max(high) / min(low)
+
+    @staticmethod
+    def _ema_step(prev, x, span):
+        if math.isnan(x):
+            return prev
+        if math.isnan(prev):
+            return x
+        alpha = 2.0 / (span + 1.0)
+        return alpha * x + (1.0 - alpha) * prev
+
+    def _commit(self, high, low, close):
+        idx = self.n
+        self.n += 1
+        self.ema_50 = self._ema_step(self.ema_50, close, 50)
+        self.ema_20 = self._ema_step(self.ema_20, close, 20)
+
+        if not math.isnan(high):
+            _push_max(self.rh, idx, high)
+        if not math.isnan(low):
+            _push_min(self.rl, idx, low)
+        self.recent.append((idx, high, low))
+        # The live bar is the window's newest slot, so committed bars fill window-1 of it
+        if len(self.recent) > self.window - 1:
+            old_idx, old_high, old_low = self.recent.popleft()
+            if not math.isnan(old_high):
+                _push_max(self.ph, old_idx, old_high)
+            if not math.isnan(old_low):
+                _push_min(self.pl, old_idx, old_low)
+
+        _expire(self.rh, self.n - (self.window - 1))
+        _expire(self.rl, self.n - (self.window - 1))
+        _expire(self.ph, self.n + 1 - 2 * self.window)
+        _expire(self.pl, self.n + 1 - 2 * self.window)
+
+    def update(self, day, high, low, close):
+        """Folds a daily bar or quote into the live bar; a newer day commits the old one."""
+        if self.live is None:
+            self.live = [day, high, low, close]
+        elif day == self.live[0]:
+            self.live = [day, _fmax(self.live[1], high), _fmin(self.live[2], low), close]
+        elif day > self.live[0]:
+            _, h, l, c = self.live
+            self._commit(h, l, c)
+            self.live = [day, high, low, close]
+        # Older than the live bar: a late duplicate, ignore
+
+    def metrics(self, labels):
+        """labels: (bullish, bearish, range) structure strings."""
+        if self.live is None:
+            return None
+        _, live_high, live_low, price = self.live
+        ema_50 = self._ema_step(self.ema_50, price, 50)
+        ema_20 = self._ema_step(self.ema_20, price, 20)
+
+        recent_high = _fmax(_front(self.rh), live_high)
+        recent_low = _fmin(_front(self.rl), live_low)
+        prior_high, prior_low = _front(self.ph), _front(self.pl)
+        bullish, bearish, range_bound = labels
+        if recent_high > prior_high and recent_low > prior_low:
+            structure = bullish
+        elif recent_high < prior_high and recent_low < prior_low:
+            structure = bearish
+        else:
+            structure = range_bound
+
+        return {
+            "price": price,
+            "ema_50": ema_50,
+            "ema_20": ema_20,
+            "is_structural_bull": price > ema_50,
+            "market_structure": structure,
+            "bar_count": self.n + 1,
+            "as_of": self.live[0],
+        }
+
+    def to_dict(self):
+        return {
+            "n": self.n, "ema_50": self.ema_50, "ema_20": self.ema_20, "live": self.live,
+            "recent": list(self.recent), "rh": list(self.rh), "rl": list(self.rl),
+            "ph": list(self.ph), "pl": list(self.pl),
+        }
+
+    @classmethod
+    def from_dict(cls, window, data):
+        state = cls(window)
+        state.n = data["n"]
+        state.ema_50 = data["ema_50"]
+        state.ema_20 = data["ema_20"]
+        state.live = data["live"]
+        state.recent = deque(tuple(x) for x in data["recent"])
+        for name in ("rh", "rl", "ph", "pl"):
+            setattr(state, name, deque(tuple(x) for x in data[name]))
+        return state
+
+
+class StreamingEngine:
+    """
+    Intraday mode: keeps a TickerState per ticker and folds each poll into it
+    instead of re-running the EMA/structure pass over the full history.
+    States seed once from the BarCache and persist to STATE_FILE between runs.
+    """
+    STATE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "stream_state.json")
+    STRUCTURE_WINDOW = IndicatorEngine.STRUCTURE_WINDOW
+    LABELS = (IndicatorEngine.BULLISH, IndicatorEngine.BEARISH, IndicatorEngine.RANGE)
+    # State for a large universe is MBs of JSON; write it at most this often (and on shutdown)
+    SAVE_INTERVAL = float(os.getenv("STREAM_SAVE_INTERVAL", "300"))
+
+    _states = None
+    _last_save = float("-inf")
+
+    @classmethod
+    def load(cls):
+        if cls._states is not None:
+            return cls._states
+        cls._states = {}
+        if os.path.exists(cls.STATE_FILE):
+            try:
+                with open(cls.STATE_FILE, 'r') as f:
+                    raw = json.load(f)
+                if raw.get("window") == cls.STRUCTURE_WINDOW:
+                    cls._states = {s: TickerState.from_dict(cls.STRUCTURE_WINDOW, d) for s, d in raw["tickers"].items()}
+                logger.info(f"📂 Restored streaming state for {len(cls._states)} tickers.")
+            except Exception as e:
+                logger.error(f"❌ Streaming state unreadable, reseeding from bar cache: {e}")
+                cls._states = {}
+        return cls._states
+
+    @classmethod
+    def save(cls):
+        if cls._states is None:
+            return
+        os.makedirs(os.path.dirname(cls.STATE_FILE), exist_ok=True)
+        tmp = cls.STATE_FILE + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"window": cls.STRUCTURE_WINDOW,
+                       "tickers": {s: st.to_dict() for s, st in cls._states.items()}}, f)
+        os.replace(tmp, cls.STATE_FILE)
+        cls._last_save = time.monotonic()
+
+    @classmethod
+    def reset(cls, symbols=None):
+        """Drops state so the next poll reseeds from the (freshly refreshed) bar cache."""
+        states = cls.load()
+        for symbol in list(symbols if symbols is not None else states):
+            states.pop(symbol, None)
+
+    @classmethod
+    def seed(cls, symbol, df):
+        """Replays a daily OHLCV history once. Every later update is O(1)."""
+        state = TickerState(cls.STRUCTURE_WINDOW)
+        days = [d.strftime("%Y-%m-%d") for d in df.index]
+        for day, high, low, close in zip(days, df["High"].to_numpy(dtype=float),
+                                         df["Low"].to_numpy(dtype=float), df["Close"].to_numpy(dtype=float)):
+            state.update(day, high, low, close)
+        cls.load()[symbol] = state
+        return state
+
+    @classmethod
+    def update(cls, symbol, day, high, low, close):
+        """Folds one bar (or a quote with high == low == close) into the ticker's state."""
+        state = cls.load().get(symbol)
+        if state is None:
+            return None
+        state.update(day, float(high), float(low), float(close))
+        return state.metrics(cls.LABELS)
+
+    @classmethod
+    def on_quote(cls, symbol, price, day=None):
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        return cls.update(symbol, day, price, price, price)
+
+    @classmethod
+    def metrics(cls, symbol):
+        state = cls.load().get(symbol)
+        return state.metrics(cls.LABELS) if state else None
+
+    @classmethod
+    def poll(cls, symbols, save=True):
+        """
+        Pulls today's running daily bar for every ticker and updates state.
+        Returns {symbol: metrics} for tickers with state; unknown tickers seed
+        from the bar cache first and are skipped if it has nothing yet.
+        """
+        from scripts.bar_cache import BarCache
+        from scripts.fetch_engine import FetchEngine
+
+        states = cls.load()
+        for symbol in symbols:
+            if symbol not in states:
+                df = BarCache.load(symbol)
+                if df is not None and not df.empty:
+                    cls.seed(symbol, df)
+
+        tracked = [s for s in symbols if s in states]
+        results = {}
+        with Metrics.span("stream.poll"):
+            frames = FetchEngine.fetch_history(tracked, period="1d")
+            for symbol in tracked:
+                df = frames.get(symbol)
+                if df is not None and not df.empty:
+                    bar = df.iloc[-1]
+                    cls.update(symbol, df.index[-1].strftime("%Y-%m-%d"), bar["High"], bar["Low"], bar["Close"])
+                results[symbol] = cls.metrics(symbol)
+        Metrics.incr("stream.tickers_updated", len(frames))
+        logger.info(f"⚡ Streaming update: {len(frames)}/{len(tracked)} tickers refreshed.")
+
+        if save and time.monotonic() - cls._last_save >= cls.SAVE_INTERVAL:
+            cls.save()
+        return results
@@ -0,0 +1,125 @@
+# scripts/structure.py
+import numpy as np
+from scripts.utils import get_logger
+
+logger = get_logger("SIP_Structure")
+
+
+class StructureEngine:
+    """
+    Multi-timeframe HH/HL market structure over aligned (tickers x days) matrices.
+    For every window length the rolling high/low series is built in O(days)
+    regardless of the window (van Herk/Gil-Werman block extrema), so each
+    timeframe costs a handful of vector ops. Each day compares the latest
+    window to the window before it, giving a label history per ticker, the
+    current label and the date of the last flip.
+    """
+    BULLISH = "BULLISH (HH/HL)"
+    BEARISH = "BEARISH (LH/LL)"
+    RANGE = "RANGE_BOUND / FLATTENING"
+    CODES = {1: BULLISH, -1: BEARISH, 0: RANGE}
+
+    # Trading-day windows. PRIMARY drives the legacy market_structure field.
+    TIMEFRAMES = {"1W": 5, "1M": 21, "3M": 63}
+    PRIMARY = "3M"
+
+    @staticmethod
+    def _rolling(matrix, window, ufunc, fill):
+        """
+        Trailing-window extrema along axis 1 via block prefix/suffix scans.
+        out[:, t] covers columns max(0, t-window+1)..t; NaNs are ignored and
+        an all-NaN window stays NaN.
+        """
+        rows, days = matrix.shape
+        if days == 0:
+            return matrix.copy()
+        blocks = -(-days // window)
+        padded = np.full((rows, blocks * window), fill)
+        padded[:, :days] = np.where(np.isnan(matrix), fill, matrix)
+        cells = padded.reshape(rows, blocks, window)
+        prefix = ufunc.accumulate(cells, axis=2).reshape(rows, -1)
+        suffix = ufunc.accumulate(cells[:, :, ::-1], axis=2)[:, :, ::-1].reshape(rows, -1)
+
+        out = prefix[:, :days].copy()
+        if days >= window:
+            # Window [t-w+1, t] = suffix of its first block + prefix of its last
+            out[:, window - 1:] = ufunc(suffix[:, :days - window + 1], prefix[:, window - 1:days])
+        out[out == fill] = np.nan
+        return out
+
+    @classmethod
+    def rolling_max(cls, matrix, window):
+        return cls._rolling(matrix, window, np.maximum, -np.inf)
+
+    @classmethod
+    def rolling_min(cls, matrix, window):
+        return cls._rolling(matrix, window, np.minimum, np.inf)
+
+    @staticmethod
+    def _shift(matrix, periods):
+        out = np.full_like(matrix, np.nan)
+        if periods < matrix.shape[1]:
+            out[:, periods:] = matrix[:, :-periods]
+        return out
+
+    @classmethod
+    def codes(cls, high, low, window):
+        """Per-day structure codes (1 bullish, -1 bearish, 0 range), shaped like high."""
+        recent_high = cls.rolling_max(high, window)
+        recent_low = cls.rolling_min(low, window)
+        prior_high = cls._shift(recent_high, window)
+        prior_low = cls._shift(recent_low, window)
+        # NaN comparisons are False, so days without both windows are RANGE
+        bullish = (recent_high > prior_high) & (recent_low > prior_low)
+        bearish = (recent_high < prior_high) & (recent_low < prior_low)
+        return bullish.astype(np.int8) - bearish.astype(np.int8)
+
+    @staticmethod
+    def warmup_end(high, window):
+        """
+        Per-row column of the first code built from two full windows
+        (first valid bar + 2*window - 1). Earlier codes compare partial
+        windows and read RANGE by construction.
+        """
+        valid = ~np.isnan(high)
+        first = np.where(valid.any(axis=1), np.argmax(valid, axis=1), high.shape[1])
+        return first + 2 * window - 1
+
+    @staticmethod
+    def last_flip(codes, start=None):
+        """
+        Column index of the latest label change per row, -1 if the label never
+        changed. start: per-row first full-window column (see warmup_end); a
+        change only counts when both sides are on or after it, so the end of
+        the warm-up is not reported as a flip.
+        """
+        if codes.shape[1] < 2:
+            return np.full(codes.shape[0], -1)
+        changed = codes[:, 1:] != codes[:, :-1]
+        if start is not None:
+            # changed[:, j] compares columns j and j+1
+            changed &= np.arange(changed.shape[1])[None, :] >= np.asarray(start)[:, None]
+        idx = codes.shape[1] - 1 - np.argmax(changed[:, ::-1], axis=1)
+        return np.where(changed.any(axis=1), idx, -1)
+
+    @classmethod
+    def compute(cls, high, low, dates, timeframes=None):
+        """
+        Returns {timeframe: {"label", "flip_date", "bars_since_flip"}} of
+        per-ticker arrays. flip_date is an ISO date string or None.
+        """
+        timeframes = timeframes or cls.TIMEFRAMES
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        days = high.shape[1]
+        out = {}
+        for name, window in timeframes.items():
+            codes = cls.codes(high, low, window)
+            current = codes[:, -1] if days else np.zeros(high.shape[0], dtype=np.int8)
+            flip = cls.last_flip(codes, cls.warmup_end(high, window))
+            flip_dates = np.array([str(dates[i]) if i >= 0 else None for i in flip], dtype=object)
+            out[name] = {
+                "label": np.array([cls.CODES[int(c)] for c in current], dtype=object),
+                "flip_date": flip_dates,
+                "bars_since_flip": np.where(flip >= 0, days - 1 - flip, -1),
+            }
+        return out
@@ -6,12 +6,15 @@ from dotenv import load_dotenv
 
 load_dotenv() # Load local .env file
 
-TOKEN = "8487210336:AAH0M21i4SwqF4F1O88fuCwRsPybyFqDwAg"
+TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 # Note: For private chats, Chat ID is a positive integer. 
 # For Channels/Groups, it usually starts with -100.
-CHAT_ID = "6665325033"
+CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 
 def verify_connection():
+    if not TOKEN:
+        print("❌ TELEGRAM_TOKEN missing: set it in your .env first.")
+        return
     # 1. First, check if the Token is even valid
     print(f"📡 Testing Token: {TOKEN[:10]}...")
     url_me = f"https://api.telegram.org/bot{TOKEN}/getMe"
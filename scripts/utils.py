@@ -1,11 +1,22 @@
 # utils.py
+import json
 import logging
+import os
 import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
 def get_logger(name):
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    
+    logger.setLevel(LOG_LEVEL)
+    # Own handler only; don't also bubble up to a root handler and print twice
+    logger.propagate = False
+
     # Check if handler exists to avoid duplicate logs in serverless re-runs
     if not logger.handlers:
         handler = logging.StreamHandler(sys.stdout)
@@ -14,5 +25,130 @@ def get_logger(name):
         )
         handler.setFormatter(formatter)
         logger.addHandler(handler)
-        
-    return logger
\ No newline at end of file
+
+    return logger
+
+
+logger = get_logger("StrategicWatcher_Metrics")
+
+
+class Metrics:
+    """
+    Process-wide timing spans and counters, flushed as one JSON record per run.
+    Spans aggregate by name (count/total/max); pass key= to also keep a
+    per-item breakdown (e.g. which feed was slow).
+
+        with Metrics.span("news.feed", key=source_name):
+            ...
+        Metrics.incr("llm.prompt_tokens", usage.prompt_tokens)
+        Metrics.flush()
+    """
+    DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "run_metrics.jsonl")
+
+    _lock = threading.Lock()
+    _spans = {}
+    _counters = {}
+    _started_at = datetime.now()
+
+    @classmethod
+    @contextmanager
+    def span(cls, name, key=None):
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            cls.record(name, time.perf_counter() - started, key=key, error=error)
+
+    @classmethod
+    def record(cls, name, seconds, key=None, error=False):
+        with cls._lock:
+            stats = cls._spans.setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0, "errors": 0})
+            stats["count"] += 1
+            stats["total_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds)
+            if error:
+                stats["errors"] += 1
+            if key is not None:
+                by_key = stats.setdefault("by_key", {})
+                by_key[str(key)] = by_key.get(str(key), 0.0) + seconds
+
+    @classmethod
+    def incr(cls, name, value=1):
+        with cls._lock:
+            cls._counters[name] = cls._counters.get(name, 0) + value
+
+    @classmethod
+    def snapshot(cls):
+        with cls._lock:
+            spans = {}
+            for name, stats in cls._spans.items():
+                out = {k: (round(v, 4) if isinstance(v, float) else v) for k, v in stats.items() if k != "by_key"}
+                if "by_key" in stats:
+                    out["by_key"] = {k: round(v, 4) for k, v in stats["by_key"].items()}
+                spans[name] = out
+            return {"spans": spans, "counters": dict(cls._counters)}
+
+    @classmethod
+    def flush(cls, run_name="audit"):
+        """Appends this run's record to data/run_metrics.jsonl and resets the collectors."""
+        record = {
+            "run_id": uuid.uuid4().hex[:12],
+            "run": run_name,
+            "started_at": cls._started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+        }
+        record.update(cls.snapshot())
+        try:
+            os.makedirs(os.path.dirname(cls.DATA_FILE), exist_ok=True)
+            with open(cls.DATA_FILE, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            logger.info("📈 Run metrics written (%d spans, %d counters).",
+                        len(record["spans"]), len(record["counters"]))
+        except Exception as e:
+            logger.error("❌ Could not write run metrics: %s", e)
+        cls.reset()
+        return record
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._spans = {}
+            cls._counters = {}
+            cls._started_at = datetime.now()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire(n) blocks until n tokens are available;
+    tokens refill continuously at `rate` per second up to `capacity`.
+    Requests larger than the capacity are let through once the bucket is full.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1.0):
+        """Returns the seconds spent waiting."""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
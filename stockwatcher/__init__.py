@@ -0,0 +1,9 @@
+# stockwatcher/__init__.py
+"""
+Lightweight command-line entry point for the StockWatcher pipeline.
+
+    python -m stockwatcher price|news|audit|notify
+
+Kept import-free on purpose: every command loads only the modules on its
+own path, so short runs don't pay for yfinance/pandas/groq.
+"""
@@ -0,0 +1,149 @@
+# stockwatcher/__main__.py
+"""
+    python -m stockwatcher price                 # refresh price_list.json
+    python -m stockwatcher news                  # poll feeds, update news_list.json
+    python -m stockwatcher audit [--send]        # one decision per portfolio, from on-disk data
+    python -m stockwatcher notify [--text T | --file F]   # default: last cached decision
+    python -m stockwatcher check-imports         # measure cold start per command
+
+Imports are resolved per command, so `notify` or a cache-hit `audit` never
+load yfinance, pandas or the Groq SDK.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+_STARTED = time.perf_counter()
+
+# Cold start budget (interpreter + imports) per command, in seconds
+IMPORT_BUDGET = {
+    "notify": float(os.getenv("STOCKWATCHER_BUDGET_NOTIFY", "0.5")),
+    "audit": float(os.getenv("STOCKWATCHER_BUDGET_AUDIT", "0.6")),
+    "news": float(os.getenv("STOCKWATCHER_BUDGET_NEWS", "0.8")),
+    "price": float(os.getenv("STOCKWATCHER_BUDGET_PRICE", "2.0")),
+}
+
+# Modules each command needs before doing any I/O; what check-imports measures
+COMMAND_IMPORTS = {
+    "notify": ["scripts.notifier", "scripts.brain", "requests"],
+    "audit": ["scripts.brain", "scripts.portfolios"],
+    "news": ["scripts.news_api", "requests", "feedparser"],
+    "price": ["scripts.stock_api", "scripts.bar_cache", "scripts.fundamentals_cache",
+              "scripts.indicators", "yfinance"],
+}
+
+
+def _universe():
+    from scripts.portfolios import PortfolioService
+    return PortfolioService.union_tickers(PortfolioService.load())
+
+
+def cmd_price(args):
+    from scripts.stock_api import StockService
+    return bool(StockService.update_prices(_universe()))
+
+
+def cmd_news(args):
+    from scripts.news_api import NewsService
+    NewsService.fetch_and_filter(_universe())
+    return True
+
+
+def cmd_audit(args):
+    from scripts.portfolios import PortfolioService
+    portfolios = PortfolioService.load()
+    decisions = PortfolioService.run_audits(portfolios)
+    if not any(decisions.values()):
+        return False
+    for name, decision in decisions.items():
+        if decision:
+            print(f"[{name}]\n{decision}\n" if len(decisions) > 1 else decision)
+    if args.send:
+        return PortfolioService.notify(portfolios, decisions)
+    return all(decisions.values())
+
+
+def cmd_notify(args):
+    from scripts.notifier import TelegramNotifier
+    if args.text:
+        text = args.text
+    elif args.file:
+        with open(args.file, "r") as f:
+            text = f.read()
+    else:
+        from scripts.brain import BrainService
+        text = BrainService.latest_decision()
+    if not text:
+        print("No decision to send (run `audit` first or pass --text/--file).", file=sys.stderr)
+        return False
+    return TelegramNotifier.send_alpha(text)
+
+
+def cmd_check_imports(args):
+    """Times a fresh interpreter importing each command's modules, against IMPORT_BUDGET."""
+    root = os.path.join(os.path.dirname(__file__), "..")
+    over = False
+    for command, modules in COMMAND_IMPORTS.items():
+        code = "import importlib\n" + "".join(f"importlib.import_module({m!r})\n" for m in modules)
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+            samples.append(time.perf_counter() - started)
+            if proc.returncode != 0:
+                print(f"{command:<7} import failed: {proc.stderr.strip().splitlines()[-1:]}")
+                over = True
+                break
+        else:
+            best = min(samples)
+            budget = IMPORT_BUDGET[command]
+            verdict = "ok" if best <= budget else "OVER"
+            over = over or best > budget
+            print(f"{command:<7} {best:6.3f}s  (budget {budget:.2f}s)  {verdict}")
+    return not over
+
+
+COMMANDS = {
+    "price": cmd_price,
+    "news": cmd_news,
+    "audit": cmd_audit,
+    "notify": cmd_notify,
+    "check-imports": cmd_check_imports,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m stockwatcher", description="StockWatcher pipeline stages.")
+    parser.add_argument("--timings", action="store_true", help="Print startup and run time to stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("price", help="Refresh price metrics")
+    sub.add_parser("news", help="Poll news feeds")
+    audit = sub.add_parser("audit", help="Run the decision layer on on-disk data")
+    audit.add_argument("--send", action="store_true", help="Also deliver the decision to Telegram")
+    notify = sub.add_parser("notify", help="Send a decision to Telegram")
+    notify.add_argument("--text", help="Message text to send")
+    notify.add_argument("--file", help="Read the message from this file")
+    check = sub.add_parser("check-imports", help="Measure cold-start import time per command")
+    check.add_argument("--repeat", type=int, default=3, help="Best-of-N runs per command")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    ready = time.perf_counter()
+    try:
+        ok = COMMANDS[args.command](args)
+    finally:
+        if args.command != "check-imports":
+            from scripts.utils import Metrics
+            Metrics.flush(f"cli.{args.command}")
+    if args.timings:
+        finished = time.perf_counter()
+        print(f"⏱️ startup {ready - _STARTED:.3f}s | {args.command} {finished - ready:.3f}s", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
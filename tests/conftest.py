@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Tests import the app as `scripts.*`, same as main.py run from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,85 @@
+# tests/test_metrics_store.py
+import json
+import pytest
+from scripts.metrics_store import MetricsStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(MetricsStore, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(MetricsStore, "HISTORY_FILE", str(tmp_path / "metrics_history.bin"))
+    monkeypatch.setattr(MetricsStore, "INDEX_FILE", str(tmp_path / "metrics_index.json"))
+    monkeypatch.setattr(MetricsStore, "LEGACY_FILE", str(tmp_path / "price_list.json"))
+    return MetricsStore
+
+
+def _metric(symbol, price, structure="BULLISH (HH/HL)", since="2024-03-01", ts="2024-06-03T10:15:00"):
+    return {
+        "symbol": symbol,
+        "price": price,
+        "ema_50": price * 0.95,
+        "is_structural_bull": True,
+        "market_structure": structure,
+        "debt_ratio": 0.42,
+        "margins": 0.125,
+        "timestamp": ts,
+        "structure_since": since,
+        "timeframes": {
+            "1W": {"structure": "BEARISH (LH/LL)", "since": "2024-05-28"},
+            "1M": {"structure": "RANGE_BOUND / FLATTENING", "since": None},
+            "3M": {"structure": structure, "since": since},
+        },
+    }
+
+
+def _snapshot(date, price):
+    return {"date": date, "metrics": {
+        "BHEL.NS": _metric("BHEL.NS", price, ts=f"{date}T10:15:00"),
+        "NTPC.NS": _metric("NTPC.NS", price / 2, structure="BEARISH (LH/LL)", ts=f"{date}T10:15:30"),
+        "DEAD.NS": "N/A",
+    }}
+
+
+def test_snapshot_round_trip_is_exact(store):
+    first, second = _snapshot("2024-06-03", 250.5), _snapshot("2024-06-04", 251.25)
+    assert store.append_snapshot(first) == 3
+    assert store.append_snapshot(second) == 3
+    assert store.latest() == second
+    assert list(store.iter_snapshots()) == [first, second]
+
+
+def test_history_and_ranges_use_the_date_index(store):
+    for day, price in [("2024-06-03", 1.0), ("2024-06-04", 2.0), ("2024-06-05", 3.0)]:
+        store.append_snapshot(_snapshot(day, price))
+    history = store.history("BHEL.NS", start="2024-06-04")
+    assert [(h["date"], h["price"]) for h in history] == [("2024-06-04", 2.0), ("2024-06-05", 3.0)]
+    assert len(store.range("2024-06-04", "2024-06-04")) == 3
+    assert store.history("UNKNOWN.NS") == []
+
+
+def test_torn_tail_write_is_ignored(store):
+    snapshot = _snapshot("2024-06-03", 100.0)
+    store.append_snapshot(snapshot)
+    with open(store.HISTORY_FILE, "ab") as f:
+        f.write(b"\x00" * (store.DTYPE.itemsize // 2))
+    assert store.latest() == snapshot
+
+    # The next write must replace the torn bytes, not land after them
+    later = _snapshot("2024-06-04", 101.0)
+    store.append_snapshot(later)
+    assert store.latest() == later
+    assert list(store.iter_snapshots()) == [snapshot, later]
+
+
+def test_older_snapshot_is_rejected(store):
+    store.append_snapshot(_snapshot("2024-06-04", 100.0))
+    with pytest.raises(ValueError):
+        store.append_snapshot(_snapshot("2024-06-03", 100.0))
+
+
+def test_legacy_price_list_seeds_the_history(store):
+    legacy = [_snapshot("2024-06-04", 2.0), _snapshot("2024-06-03", 1.0)]
+    with open(store.LEGACY_FILE, "w") as f:
+        json.dump(legacy, f)
+    assert store.latest() == legacy[0]
+    assert [s["date"] for s in store.iter_snapshots()] == ["2024-06-03", "2024-06-04"]
@@ -0,0 +1,27 @@
+# tests/test_scoring.py
+from scripts.scoring import ScoringEngine
+
+BASES = ["BHEL", "NTPC", "LT"]
+
+
+def _item(title, score, tickers=None, category="POLICY"):
+    return {"title": title, "category": category, "relevance_score": score,
+            "is_critical": score >= 9, "tickers": tickers or []}
+
+
+def test_routine_sector_item_does_not_flatten_the_news_column():
+    news = [
+        _item("BHEL bags boiler order", 7, ["BHEL"], "ORDER_WIN"),
+        _item("NTPC capex update", 6, ["NTPC"]),
+        _item("Power ministry reviews grid plan", 6),
+    ]
+    bhel, ntpc, lt = ScoringEngine.news_scores(BASES, news)
+    assert bhel == 1.0
+    assert ntpc == 0.5
+    assert 0 < lt < ntpc
+
+
+def test_critical_sector_item_lifts_every_ticker_to_the_sector_score():
+    news = [_item("Cabinet clears power sector package", 9)]
+    scores = ScoringEngine.news_scores(BASES, news)
+    assert list(scores) == [ScoringEngine.SECTOR_NEWS_SCORE] * len(BASES)
@@ -0,0 +1,65 @@
+# tests/test_streaming.py
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.indicators import IndicatorEngine
+from scripts.streaming import StreamingEngine, TickerState
+
+DAYS = [d.strftime("%Y-%m-%d") for d in pd.bdate_range("2024-01-01", periods=220)]
+
+
+def _series(seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(DAYS))))
+    high = close * (1 + rng.uniform(0, 0.02, len(DAYS)))
+    low = close * (1 - rng.uniform(0, 0.02, len(DAYS)))
+    return high, low, close
+
+
+def _replay(high, low, close):
+    state = TickerState(StreamingEngine.STRUCTURE_WINDOW)
+    for day, h, l, c in zip(DAYS, high, low, close):
+        state.update(day, h, l, c)
+    return state
+
+
+def _assert_matches_batch(metrics, high, low, close):
+    batch = IndicatorEngine.compute(close[None, :], high[None, :], low[None, :])
+    assert metrics["price"] == pytest.approx(batch["price"][0])
+    assert metrics["ema_50"] == pytest.approx(batch["ema_50"][0], rel=1e-12)
+    assert metrics["ema_20"] == pytest.approx(batch["ema_20"][0], rel=1e-12)
+    assert metrics["is_structural_bull"] == bool(batch["is_structural_bull"][0])
+    assert metrics["market_structure"] == batch["market_structure"][0]
+    assert metrics["bar_count"] == batch["bar_count"][0]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_replayed_state_matches_batch_indicators(seed):
+    high, low, close = _series(seed)
+    state = _replay(high, low, close)
+    _assert_matches_batch(state.metrics(StreamingEngine.LABELS), high, low, close)
+    # Same EMA as the pandas reference the batch engine mirrors
+    ema = pd.Series(close).ewm(span=50, adjust=False).mean().iloc[-1]
+    assert state.metrics(StreamingEngine.LABELS)["ema_50"] == pytest.approx(ema, rel=1e-12)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_intraday_quotes_fold_into_the_live_bar(seed):
+    high, low, close = _series(seed)
+    state = _replay(high[:-1], low[:-1], close[:-1])
+    quotes = np.linspace(low[-1], high[-1], 5)
+    for price in [*quotes, close[-1]]:
+        state.update(DAYS[-1], price, price, price)
+    _assert_matches_batch(state.metrics(StreamingEngine.LABELS), high, low, close)
+
+
+def test_state_survives_json_round_trip():
+    high, low, close = _series(99)
+    split = 150
+    uninterrupted = _replay(high, low, close)
+    restored = _replay(high[:split], low[:split], close[:split])
+    restored = TickerState.from_dict(restored.window, json.loads(json.dumps(restored.to_dict())))
+    for day, h, l, c in zip(DAYS[split:], high[split:], low[split:], close[split:]):
+        restored.update(day, h, l, c)
+    assert restored.metrics(StreamingEngine.LABELS) == uninterrupted.metrics(StreamingEngine.LABELS)
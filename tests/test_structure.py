@@ -0,0 +1,79 @@
+# tests/test_structure.py
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.indicators import IndicatorEngine
+from scripts.structure import StructureEngine
+
+
+def _naive_rolling(matrix, window, reduce):
+    out = np.full(matrix.shape, np.nan)
+    for t in range(matrix.shape[1]):
+        cells = matrix[:, max(0, t - window + 1):t + 1]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN windows stay NaN
+            out[:, t] = reduce(cells, axis=1)
+    return out
+
+
+def _random_ohlc(rng, tickers=20, days=300, nan_rate=0.05):
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (tickers, days)), axis=1))
+    high = close * (1 + rng.uniform(0, 0.02, close.shape))
+    low = close * (1 - rng.uniform(0, 0.02, close.shape))
+    gaps = rng.random(close.shape) < nan_rate
+    high[gaps] = np.nan
+    low[gaps] = np.nan
+    return high, low
+
+
+@pytest.mark.parametrize("window", [1, 2, 5, 21, 63, 400])
+def test_rolling_extrema_match_naive_windows(window):
+    high, low = _random_ohlc(np.random.default_rng(window))
+    np.testing.assert_array_equal(StructureEngine.rolling_max(high, window), _naive_rolling(high, window, np.nanmax))
+    np.testing.assert_array_equal(StructureEngine.rolling_min(low, window), _naive_rolling(low, window, np.nanmin))
+
+
+def test_latest_code_matches_single_window_structure():
+    high, low = _random_ohlc(np.random.default_rng(1), tickers=200, nan_rate=0.0)
+    window = IndicatorEngine.STRUCTURE_WINDOW
+    codes = StructureEngine.codes(high, low, window)[:, -1]
+    labels = np.array([StructureEngine.CODES[int(c)] for c in codes], dtype=object)
+    np.testing.assert_array_equal(labels, IndicatorEngine.structure(high, low, window))
+
+
+def test_warmup_end_is_not_a_flip():
+    dates = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-01-01") + 300)
+    trend = np.linspace(100, 200, 300)[None, :]
+    result = StructureEngine.compute(trend + 1, trend - 1, dates)
+    for timeframe in StructureEngine.TIMEFRAMES:
+        assert result[timeframe]["label"][0] == StructureEngine.BULLISH
+        assert result[timeframe]["flip_date"][0] is None
+        assert result[timeframe]["bars_since_flip"][0] == -1
+
+
+def test_reversal_is_a_flip_and_late_listings_warm_up_from_their_first_bar():
+    dates = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-01-01") + 300)
+    reversal = np.r_[np.linspace(100, 200, 200), np.linspace(200, 120, 100)]
+    late = np.r_[np.full(100, np.nan), np.linspace(100, 200, 200)]
+    series = np.vstack([reversal, late])
+    result = StructureEngine.compute(series + 1, series - 1, dates)["3M"]
+    assert result["label"][0] == StructureEngine.BEARISH
+    assert dates[0] + 200 <= np.datetime64(result["flip_date"][0]) <= dates[-1]
+    assert result["label"][1] == StructureEngine.BULLISH
+    assert result["flip_date"][1] is None
+
+
+def test_tz_aware_index_keeps_exchange_local_dates():
+    closes = np.r_[np.linspace(100, 200, 200), np.linspace(200, 120, 100)]
+    naive = pd.bdate_range("2023-08-01", periods=len(closes))
+    frame = pd.DataFrame({"Close": closes, "High": closes + 1, "Low": closes - 1}, index=naive)
+    aware = frame.set_axis(naive.tz_localize("Asia/Kolkata"))
+
+    results = []
+    for df in (frame, aware):
+        _, dates, _, high, low = IndicatorEngine.stack({"A.NS": df})
+        assert list(dates) == list(naive)
+        results.append(StructureEngine.compute(high, low, dates.values)["3M"]["flip_date"][0])
+    assert results[0] is not None
+    assert results[0] == results[1]